@@ -2,5 +2,17 @@
 #  License, v. 2.0. If a copy of the MPL was not distributed with this
 #  file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
-from .conn import StarPRNT, StarPRNTEthernet
-from .enums import Model, UTF8Font, ImageAlignment, PrintSpeed, PrintDensity
\ No newline at end of file
+from .batch import render_batch
+from .cache import RasterCache
+from .conn import StarPRNT, StarPRNTConnection, StarPRNTEthernet, StarPRNTUSB, StarPRNTBluetooth
+from .job import StarPRNTJob
+from .jobqueue import JobQueue
+from .logos import LogoRegistry
+from .metrics import Metrics, RecordingMetrics
+from .pool import PrinterPool
+from .spool import Spool
+from .template import ReceiptTemplate
+from .text import TextRenderer
+from .transport import Transport, StreamTransport, DeviceTransport, LoopbackTransport
+from .enums import Model, UTF8Font, ImageAlignment, PrintSpeed, PrintDensity, DitherAlgorithm, CodePage, JobState, \
+    Barcode, QRErrorCorrection
\ No newline at end of file
@@ -3,141 +3,234 @@
 #  file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
 from struct import unpack
-from typing import TypedDict, Any
+from typing import Any, NamedTuple, Iterator
 
 
-class ASB(TypedDict, total=False):
-    raw: bytes
-    version: int
+def _bit(byte: int, bit: int) -> bool:
+    return bool(byte & (1 << bit))
+
+
+def _seven_bit(byte: int) -> int:
+    # multi-bit ASB values skip bit 0 and bit 4 like the headers do
+    return ((byte & 0b1110) >> 1) | ((byte & 0b1100000) >> 2)
+
+
+class _Flag:
+    __slots__ = ("index", "mask", "inverted")
+
+    def __init__(self, index: int, bit: int, inverted: bool = False):
+        self.index = index
+        self.mask = 1 << bit
+        self.inverted = inverted
+
+    def __get__(self, status: "ASB | None", owner=None) -> "bool | None | _Flag":
+        if status is None:
+            return self
+        if self.index >= status.size:
+            return None
+        return bool(status.raw[self.index] & self.mask) != self.inverted
+
+
+class _Value:
+    __slots__ = ("index", "mask", "decode")
+
+    def __init__(self, index: int, mask: int, decode):
+        self.index = index
+        self.mask = mask
+        self.decode = decode
+
+    def __get__(self, status: "ASB | None", owner=None) -> "int | None | _Value":
+        if status is None:
+            return self
+        if self.index >= status.size:
+            return None
+        return self.decode(status.raw[self.index])
+
+
+_PAPER_WIDTHS = {0: 80, 1: 58, 2: 40, 3: 25}
+
+
+class ASB:
+    # automatic status back, decoded lazily from the raw frame
+
+    __slots__ = ("raw", "size")
+
+    version = _Value(1, 0b101110, lambda byte: ((byte & 0b1110) >> 1) | ((byte & 0b100000) >> 2))
     # 3
-    offline_by_sw: bool
-    cover_open: bool
-    online: bool
-    drawer_open: bool
-    etb: bool
+    offline_by_sw = _Flag(2, 6)
+    cover_open = _Flag(2, 5)
+    online = _Flag(2, 3, inverted=True)
+    drawer_open = _Flag(2, 2)
+    etb = _Flag(2, 1)
     # 4
-    head_overheat: bool
-    irrecoverable_error: bool
-    auto_cutter_error: bool
-    mechanical_error: bool
-    head_themistor_error: bool
+    head_overheat = _Flag(3, 6)
+    irrecoverable_error = _Flag(3, 5)
+    auto_cutter_error = _Flag(3, 3)
+    mechanical_error = _Flag(3, 2)
+    head_themistor_error = _Flag(3, 1)
     # 5
-    black_mark_error: bool
-    paper_jam_error: bool
-    voltage_error: bool
+    black_mark_error = _Flag(4, 3)
+    paper_jam_error = _Flag(4, 2)
+    voltage_error = _Flag(4, 1)
     # 6
-    paper_position_error: bool
-    paper_end: bool
-    paper_near_end_inner: bool
-    paper_near_end_outer: bool
+    paper_position_error = _Flag(5, 5)
+    paper_end = _Flag(5, 3)
+    paper_near_end_inner = _Flag(5, 2)
+    paper_near_end_outer = _Flag(5, 1)
     # 7
-    paper_hold_sensor: bool
+    paper_hold_sensor = _Flag(6, 1)
     # 8
-    etb_counter: int
+    etb_counter = _Value(7, 0b1101110, _seven_bit)
     # 10
-    pcb_overheat: bool
-    drawer_open_error: bool
-    flash_access_error: bool
-    eeprom_access_error: bool
-    sram_access_error: bool
+    pcb_overheat = _Flag(9, 6)
+    drawer_open_error = _Flag(9, 5)
+    flash_access_error = _Flag(9, 3)
+    eeprom_access_error = _Flag(9, 2)
+    sram_access_error = _Flag(9, 1)
     # 11
-    pcb_themistor_error: bool
-    sensor_adjustment_error: bool
-    printer_unit_open: bool
-    spooler_buffer_full: bool
+    pcb_themistor_error = _Flag(10, 6)
+    sensor_adjustment_error = _Flag(10, 5)
+    printer_unit_open = _Flag(10, 3)
+    spooler_buffer_full = _Flag(10, 2)
     # 12
-    interface: int
-    # 13:
-    drawer_op_method: bool
-    drawer_status: bool
+    interface = _Value(11, 0b1101110, _seven_bit)
+    # 13
+    drawer_op_method = _Flag(12, 6)
+    drawer_status = _Flag(12, 5)
     # 15
-    external_1_connected: bool
-    external_2_connected: bool
+    external_1_connected = _Flag(14, 6)
+    external_2_connected = _Flag(14, 5)
     # 16
-    part_replace_notify: bool
-    clean_notify: bool
-    paper_width: int
+    part_replace_notify = _Flag(15, 6)
+    clean_notify = _Flag(15, 5)
+    paper_width = _Value(15, 0b1110, lambda byte: _PAPER_WIDTHS.get((byte & 0b1110) >> 1))
 
+    def __init__(self, raw: bytes = b""):
+        self.raw = raw
+        self.size = _seven_bit(raw[0]) if raw else 0
 
-def _bit(byte: int, bit: int) -> bool:
-    return bool(byte & (1 << bit))
+    @property
+    def extension(self) -> bool:
+        return len(self.raw) > 1 and _bit(self.raw[1], 7)
 
-def parse_asb(asb: bytes) -> tuple[ASB, dict[str, Any] | None]:
-    res = {"raw": asb}
-    header1 = asb[0]
-    size = ((header1 & 0b1110) >> 1) | ((header1 & 0b1100000) >> 2)
-    print(f"{size=}")
-    header2 = asb[1]
-    version = ((header2 & 0b1110) >> 1) | ((header2 & 0b100000) >> 2)
-    res["version"] = version
-    print(f"{version=}")
-    extension = _bit(header2, 7)
-    print(f"{extension=}")
-    if size >= 3:
-        res["offline_by_sw"] = _bit(asb[2], 6)
-        res["cover_open"] = _bit(asb[2], 5)
-        res["online"] = not _bit(asb[2], 3)
-        res["drawer_open"] = _bit(asb[2], 2)
-        res["etb"] = _bit(asb[2], 1)
-    if size >= 4:
-        res["head_overheat"] = _bit(asb[3], 6)
-        res["irrecoverable_error"] = _bit(asb[3], 5)
-        res["auto_cutter_error"] = _bit(asb[3], 3)
-        res["mechanical_error"] = _bit(asb[3], 2)
-        res["head_themistor_error"] = _bit(asb[3], 1)
-    if size >= 5:
-        res["black_mark_error"] = _bit(asb[4], 3)
-        res["paper_jam_error"] = _bit(asb[4], 2)
-        res["voltage_error"] = _bit(asb[4], 1)
-    if size >= 6:
-        res["paper_position_error"] = _bit(asb[5], 5)
-        res["paper_end"] = _bit(asb[5], 3)
-        res["paper_near_end_inner"] = _bit(asb[5], 2)
-        res["paper_near_end_outer"] = _bit(asb[5], 1)
-    if size >= 7:
-        res["paper_hold_sensor"] = _bit(asb[6], 1)
-    if size >= 8:
-        res["etb_counter"] = ((asb[7] & 0b1110) >> 1) | ((asb[7] & 0b1100000) >> 2)
-    if size >= 10:
-        res["pcb_overheat"] = _bit(asb[9], 6)
-        res["drawer_open_error"] = _bit(asb[9], 5)
-        res["flash_access_error"] = _bit(asb[9], 3)
-        res["eeprom_access_error"] = _bit(asb[9], 2)
-        res["sram_access_error"] = _bit(asb[9], 1)
-    if size >= 11:
-        res["pcb_themistor_error"] = _bit(asb[10], 6)
-        res["sensor_adjustment_error"] = _bit(asb[10], 5)
-        res["printer_unit_open"] = _bit(asb[10], 3)
-        res["spooler_buffer_full"] = _bit(asb[10], 2)
-    if size >= 12:
-        res["interface"] = ((asb[11] & 0b1110) >> 1) | ((asb[11] & 0b1100000) >> 2)
-    if size >= 13:
-        res["drawer_op_method"] = _bit(asb[12], 6)
-        res["drawer_status"] = _bit(asb[12], 5)
-    if size >= 15:
-        res["external_1_connected"] = _bit(asb[14], 6)
-        res["external_2_connected"] = _bit(asb[14], 5)
-    if size >= 16:
-        res["part_replace_notify"] = _bit(asb[15], 6)
-        res["clean_notify"] = _bit(asb[15], 5)
-        if (width := (asb[15] & 0b1110) >> 1) == 0:
-            res["paper_width"] = 80
-        elif width == 1:
-            res["paper_width"] = 58
-        elif width == 2:
-            res["paper_width"] = 40
-        elif width == 3:
-            res["paper_width"] = 25
+    def changes(self, previous: "ASB | None") -> list[str]:
+        # names of the fields that differ from the previous frame, only bytes that changed are looked at
+        if previous is None or previous.size != self.size:
+            return [name for name in FIELDS if getattr(self, name) is not None]
+        diff = int.from_bytes(self.raw[:self.size], "little") ^ int.from_bytes(previous.raw[:self.size], "little")
+        changed = []
+        index = 0
+        while diff:
+            if byte := diff & 0xff:
+                for name, mask in _FIELDS_BY_BYTE.get(index, ()):
+                    if byte & mask:
+                        changed.append(name)
+            diff >>= 8
+            index += 1
+        return changed
+
+    # dict style access, the status used to be a TypedDict
+
+    def __getitem__(self, key: str) -> Any:
+        if key != "raw" and key not in FIELDS:
+            raise KeyError(key)
+        if (value := getattr(self, key)) is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return key == "raw" or key in FIELDS and getattr(self, key) is not None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def items(self) -> Iterator[tuple[str, Any]]:
+        for name in FIELDS:
+            if (value := getattr(self, name)) is not None:
+                yield name, value
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ASB):
+            return NotImplemented
+        return self.raw[:self.size] == other.raw[:other.size]
+
+    def __hash__(self) -> int:
+        return hash(self.raw[:self.size])
+
+    def __repr__(self) -> str:
+        return f"ASB({dict(self.items())})"
+
+
+FIELDS = tuple(name for name, value in vars(ASB).items() if isinstance(value, (_Flag, _Value)))
+_FIELDS_BY_BYTE: dict[int, list[tuple[str, int]]] = {}
+for _name in FIELDS:
+    _field = vars(ASB)[_name]
+    _FIELDS_BY_BYTE.setdefault(_field.index, []).append((_name, _field.mask))
+
+
+def parse_asb(asb: bytes | memoryview) -> tuple[ASB, dict[str, Any] | None]:
+    res = ASB(bytes(asb))
+    size = res.size
     extra = None
-    if extension:
+    if res.extension:
         status_length = unpack("<H", asb[size:size+2])[0]
         if status_length > 0:
             status_data = asb[size+2:size+2+status_length]
-            status_type = status_data[0:2]
-            value = status_data[6:-1]
+            status_type = bytes(status_data[0:2])
+            value = bytes(status_data[6:-1])
             if status_type == b"11":
                 extra = {"printer_version": value.decode()[4:-2]}
             else:
                 extra = {status_type.decode(): value}
     return res, extra
 
+
+class ASBEvent(NamedTuple):
+    status: ASB
+    extra: dict[str, Any] | None
+
+
+def _frame_length(buffer: memoryview, pos: int, size: int) -> int | None:
+    # total length of the frame starting at pos, None if more data is needed
+    if len(buffer) - pos < size:
+        return None
+    if not _bit(buffer[pos + 1], 7):
+        return size
+    if len(buffer) - pos < size + 2:
+        return None
+    status_length = unpack("<H", buffer[pos + size:pos + size + 2])[0]
+    return size + 2 + status_length
+
+
+class ASBParser:
+    # reassembles ASB frames from a byte stream, a read may hold a partial frame or several of them
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> list[ASBEvent]:
+        self._buffer += data
+        events = []
+        pos = 0
+        with memoryview(self._buffer) as view:
+            while pos < len(view):
+                header1 = view[pos]
+                size = _seven_bit(header1)
+                # header 1 always has bit 0 set and bits 4 and 7 cleared, skip garbage until it lines up
+                if header1 & 0b10010001 != 0b1 or size < 3:
+                    pos += 1
+                    continue
+                length = _frame_length(view, pos, size)
+                if length is None or len(view) - pos < length:
+                    break
+                with view[pos:pos + length] as frame:
+                    events.append(ASBEvent(*parse_asb(frame)))
+                pos += length
+        del self._buffer[:pos]
+        return events
+
+    def reset(self):
+        del self._buffer[:]
@@ -0,0 +1,63 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import os
+import pathlib
+from concurrent.futures import Executor, ProcessPoolExecutor
+from io import BytesIO
+from typing import Any, Iterable
+
+from .enums import ImageAlignment, DitherAlgorithm
+from .raster import rasterize
+
+# a source on its own uses the batch-wide parameters, (source, {"dithering": ...}) overrides some of them
+BatchItem = str | BytesIO | tuple[str | BytesIO, dict[str, Any]]
+
+
+def _render(item: tuple[str | BytesIO, dict[str, Any], str | None]) -> bytes | str:
+    source, params, path = item
+    data = rasterize(source, **params)
+    if path is None:
+        return data
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return path
+
+
+def render_batch(items: Iterable[BatchItem], alignment: ImageAlignment = ImageAlignment.Center,
+                 dithering: DitherAlgorithm = DitherAlgorithm.Sierra3, width: int = 576,
+                 gamma: float | None = None, contrast: float = 1.0, trim: bool = True,
+                 spool_dir: str | os.PathLike | None = None, executor: Executor | None = None,
+                 max_workers: int | None = None, chunksize: int = 4) -> list[bytes] | list[pathlib.Path]:
+    # rasterizes every item across a process pool, in order; returns the ESC GS S payloads,
+    # or with spool_dir the paths of NNNNNN.raster files holding them, which keeps payloads
+    # from being shipped back to this process at all
+    defaults = {"alignment": alignment, "dithering": dithering, "width": width, "gamma": gamma, "contrast": contrast,
+                "trim": trim}
+    if spool_dir is not None:
+        spool_dir = pathlib.Path(spool_dir)
+        spool_dir.mkdir(parents=True, exist_ok=True)
+    work = []
+    for index, item in enumerate(items):
+        if isinstance(item, tuple):
+            source, overrides = item
+            params = defaults | overrides
+        else:
+            source, params = item, defaults
+        path = str(spool_dir / f"{index:06d}.raster") if spool_dir is not None else None
+        work.append((source, params, path))
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers)
+    try:
+        results = list(executor.map(_render, work, chunksize=chunksize))
+    finally:
+        if own_executor:
+            executor.shutdown()
+    if spool_dir is not None:
+        return [pathlib.Path(path) for path in results]
+    return results
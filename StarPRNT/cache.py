@@ -0,0 +1,174 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import asyncio
+import hashlib
+import os
+import pathlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor
+from enum import Enum
+
+
+class RasterCache:
+    # LRU of finished ESC GS S payloads keyed by image content and render parameters,
+    # optionally backed by a directory so entries survive restarts. The directory is an LRU of its own,
+    # bounded by max_disk_bytes and evicted by file mtime, which every disk hit refreshes.
+    # fetch() and save() are for coroutines, they keep the file I/O in an executor
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, directory: str | os.PathLike | None = None,
+                 max_disk_bytes: int = 256 * 1024 * 1024):
+        if max_bytes <= 0 or max_disk_bytes <= 0:
+            raise ValueError("cache size must be positive")
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.directory = pathlib.Path(directory) if directory is not None else None
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        # disk entries are written from executor threads
+        self._disk_lock = threading.Lock()
+        self._disk_size = 0
+        self.hits = 0
+        self.misses = 0
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._trim_disk()
+
+    @staticmethod
+    def key(data: bytes, *params) -> str:
+        digest = hashlib.sha256(data)
+        for param in params:
+            if isinstance(param, Enum):
+                param = param.name
+            digest.update(b"\0" + repr(param).encode())
+        return digest.hexdigest()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def disk_size(self) -> int:
+        return self._disk_size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        if key in self._entries:
+            return True
+        path = self._path(key)
+        return path is not None and path.exists()
+
+    def _path(self, key: str) -> pathlib.Path | None:
+        if self.directory is None:
+            return None
+        return self.directory / f"{key}.raster"
+
+    def _lookup(self, key: str) -> bytes | None:
+        payload = self._entries.get(key)
+        if payload is not None:
+            self._entries.move_to_end(key)
+        return payload
+
+    def _load(self, key: str) -> bytes | None:
+        # disk tier only, safe to run in a thread
+        path = self._path(key)
+        if path is None:
+            return None
+        try:
+            payload = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return payload
+
+    def _store(self, key: str, payload: bytes):
+        # disk tier only, safe to run in a thread
+        path = self._path(key)
+        if path is None or len(payload) > self.max_disk_bytes:
+            return
+        with self._disk_lock:
+            if path.exists():
+                return
+            # write to a temporary name first so a crash never leaves a truncated entry
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(payload)
+            os.replace(tmp, path)
+            self._disk_size += len(payload)
+            if self._disk_size > self.max_disk_bytes:
+                self._trim_disk()
+
+    def _trim_disk(self):
+        # least recently used files go first; sizes are rescanned since other processes may share the directory
+        files = []
+        for path in self.directory.glob("*.raster"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        self._disk_size = total
+
+    def get(self, key: str) -> bytes | None:
+        payload = self._lookup(key)
+        if payload is None and (payload := self._load(key)) is not None:
+            self._insert(key, payload)
+        if payload is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return payload
+
+    def put(self, key: str, payload: bytes):
+        self._insert(key, payload)
+        self._store(key, payload)
+
+    async def fetch(self, key: str, executor: Executor | None = None) -> bytes | None:
+        # get() with the disk read in an executor
+        payload = self._lookup(key)
+        if payload is None and self.directory is not None:
+            payload = await asyncio.get_running_loop().run_in_executor(executor, self._load, key)
+            if payload is not None:
+                self._insert(key, payload)
+        if payload is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return payload
+
+    async def save(self, key: str, payload: bytes, executor: Executor | None = None):
+        # put() with the disk write in an executor
+        self._insert(key, payload)
+        if self.directory is not None:
+            await asyncio.get_running_loop().run_in_executor(executor, self._store, key, payload)
+
+    def _insert(self, key: str, payload: bytes):
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key))
+        if len(payload) > self.max_bytes:
+            # would evict everything else and still not fit, only keep it on disk
+            return
+        self._entries[key] = payload
+        self._size += len(payload)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def clear(self, disk: bool = False):
+        self._entries.clear()
+        self._size = 0
+        if disk and self.directory is not None:
+            with self._disk_lock:
+                for path in self.directory.glob("*.raster"):
+                    path.unlink(missing_ok=True)
+                self._disk_size = 0
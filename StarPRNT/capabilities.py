@@ -0,0 +1,106 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+from .enums import Model, PrintSpeed, PrintDensity, UTF8Font
+
+# the per model command variants from the StarPRNT command spec, as finished byte sequences
+
+_SPEED = b"\x1b\x1er"
+_SPEED_TYPES = {
+    1: {PrintSpeed.Fast: _SPEED + b"\x00", PrintSpeed.Normal: _SPEED + b"\x01", PrintSpeed.Slow: _SPEED + b"\x02"},
+    2: {PrintSpeed.Fast: _SPEED + b"\x00", PrintSpeed.Slow: _SPEED + b"\x02"},
+    3: {PrintSpeed.Fast: _SPEED + b"\x02", PrintSpeed.Normal: _SPEED + b"\x01", PrintSpeed.Slow: _SPEED + b"\x00"},
+}
+
+_DENSITY = b"\x1b\x1ed"
+_DENSITY_TYPES = {
+    1: {PrintDensity.Plus3: _DENSITY + b"0", PrintDensity.Plus2: _DENSITY + b"1", PrintDensity.Plus1: _DENSITY + b"2",
+        PrintDensity.Standard: _DENSITY + b"3", PrintDensity.Minus1: _DENSITY + b"4",
+        PrintDensity.Minus2: _DENSITY + b"5", PrintDensity.Minus3: _DENSITY + b"6"},
+    2: {PrintDensity.Plus3: _DENSITY + b"0", PrintDensity.Plus2: _DENSITY + b"1", PrintDensity.Plus1: _DENSITY + b"2",
+        PrintDensity.Standard: _DENSITY + b"3"},
+    3: {PrintDensity.Medium: _DENSITY + b"0", PrintDensity.Low: _DENSITY + b"1", PrintDensity.High: _DENSITY + b"2",
+        PrintDensity.Special: _DENSITY + b"3"},
+    4: {PrintDensity.Medium: _DENSITY + b"0", PrintDensity.Low: _DENSITY + b"1", PrintDensity.High: _DENSITY + b"2"},
+    5: {PrintDensity.Plus3: _DENSITY + b"0", PrintDensity.Plus2: _DENSITY + b"1", PrintDensity.Plus1: _DENSITY + b"2",
+        PrintDensity.Standard: _DENSITY + b"3", PrintDensity.Minus1: _DENSITY + b"4",
+        PrintDensity.Minus2: _DENSITY + b"5", PrintDensity.Minus3: _DENSITY + b"6", PrintDensity.Plus4: _DENSITY + b"7"},
+}
+
+_UTF8_FONT = b"\x1b\x1d)U\x05\x00A"
+_UTF8_FONTS = {
+    UTF8Font.Japanese: _UTF8_FONT + bytes([1, 2, 3, 4]),
+    UTF8Font.SimplifiedChinese: _UTF8_FONT + bytes([2, 3, 1, 4]),
+    UTF8Font.TraditionalChinese: _UTF8_FONT + bytes([3, 2, 1, 4]),
+    UTF8Font.Korean: _UTF8_FONT + bytes([4, 1, 2, 3]),
+}
+
+_SM = (Model.SM_L200, Model.SM_L300, Model.SM_S_T)
+
+
+def parse_version(version: str) -> tuple[int, ...]:
+    # "3.0" -> (3, 0), so "10.0" sorts after "2.4"; anything unreadable counts as version 0
+    return tuple(int(part) for part in re.findall(r"\d+", version)) or (0,)
+
+
+class Capabilities(NamedTuple):
+    # None for commands the model / firmware doesn't have, otherwise argument -> command bytes
+    model: Model
+    version: tuple[int, ...]
+    print_speed: dict[PrintSpeed, bytes] | None
+    print_density: dict[PrintDensity, bytes] | None
+    utf8_font: dict[UTF8Font, bytes] | None
+    external_device_1: bytes | None
+    external_device_2: bytes | None
+
+    def supports(self, command: str) -> bool:
+        return getattr(self, command) is not None
+
+
+def _speed_type(model: Model) -> int | None:
+    if model in (Model.mC_Print3_G1, Model.TSP100, Model.mC_Label3, Model.mC_Print3_G2):
+        return 1
+    if model == Model.mPOP:
+        return 2
+    if model == Model.SM_S_T:
+        return 3
+    return None
+
+
+def _density_type(model: Model, version: tuple[int, ...]) -> int | None:
+    if model in (Model.mPOP, Model.TSP100, Model.mC_Label3) or model == Model.mC_Print3_G1 and version <= (2, 4):
+        return 1
+    if model == Model.mC_Print2:
+        return 2
+    if model in (Model.SM_L200, Model.SM_L300):
+        return 3
+    if model == Model.SM_S_T:
+        return 4
+    if model == Model.mC_Print3_G1 and version >= (3, 0) or model == Model.mC_Print3_G2:
+        return 5
+    return None
+
+
+@lru_cache(maxsize=None)
+def _capabilities(model: Model, version: tuple[int, ...]) -> Capabilities:
+    speed = _speed_type(model)
+    density = _density_type(model, version)
+    return Capabilities(
+        model=model,
+        version=version,
+        print_speed=_SPEED_TYPES[speed] if speed is not None else None,
+        print_density=_DENSITY_TYPES[density] if density is not None else None,
+        utf8_font=_UTF8_FONTS if model not in (Model.mPOP, *_SM) else None,
+        external_device_1=b"\x07" if model not in _SM else None,
+        external_device_2=b"\x1a" if model not in _SM and not (model == Model.mPOP and version < (2, 0)) else None,
+    )
+
+
+def capabilities_for(model: Model, version: str) -> Capabilities:
+    # one shared table per (model, firmware version)
+    return _capabilities(model, parse_version(version))
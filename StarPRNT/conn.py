@@ -4,16 +4,28 @@
 import os.path
 import pathlib
 from abc import ABC, abstractmethod
-from asyncio import StreamReader, StreamWriter
 from enum import Enum
 from io import BytesIO
 from ipaddress import IPv4Address
 import asyncio
-from struct import pack
-
-from PIL import Image, ImageOps
-from .asb import ASB, parse_asb
-from .enums import ImageAlignment, PrintSpeed, Model, UTF8Font, PrintDensity, ReducedH, ReducedV, Font
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Any, Iterable, NamedTuple
+from weakref import WeakSet
+
+from .asb import ASB, ASBParser, FIELDS
+from .cache import RasterCache
+from .capabilities import Capabilities, capabilities_for
+from .encoding import TextEncoder, CODE_PAGES, encoder_for
+from .metrics import Metrics, NULL_METRICS
+from .raster import rasterize_timed, rasterize_bands, nv_image
+from .text import TextRenderer
+from .transport import Transport, open_tcp, open_rfcomm, DeviceTransport
+from .status import StatusListener, StatusSubscription, field_filter
+from .symbols import barcode_command, qr_command, pdf417_command
+from .enums import ImageAlignment, PrintSpeed, Model, UTF8Font, PrintDensity, ReducedH, ReducedV, Font, DitherAlgorithm, \
+    CodePage, Barcode, QRErrorCorrection
 
 
 class StarPRNT(ABC):
@@ -23,12 +35,49 @@ class StarPRNT(ABC):
         Bluetooth = 1
         USB = 2
 
-    def __init__(self, interface_type: InterfaceType, model: Model = Model.Unknown):
+    def __init__(self, interface_type: InterfaceType, model: Model = Model.Unknown, executor: Executor | None = None):
         self.interface_type = interface_type
+        # refreshed whenever model or version change, see capabilities.py
+        self.capabilities: Capabilities
+        self._version = "0.0"
         self.model = model
-        self.version = "0.0"
+        # None runs image rasterization in the event loop's default thread pool
+        self.executor = executor
+        # may be shared between connections
+        self.raster_cache: RasterCache | None = None
+        self.metrics: Metrics = NULL_METRICS
+        # tone curve for images on this printer, a None gamma keeps the built-in curve for colour images
+        self.image_gamma: float | None = None
+        self.image_contrast = 1.0
+        # send blank rows as paper feeds and drop white on the right, prints the same with fewer bytes
+        self.image_trim = True
+        # used by print_text_image, None is Pillow's bundled font at 24 px
+        self.text_renderer: TextRenderer | None = None
+        # name -> number of the logos stored on the printer, filled in by LogoRegistry.ensure
+        self.logos: dict[str, int] = {}
+        # None uses UTF-8, or CP437 on models without UTF-8 support
+        self.code_page: CodePage | None = None
         self.status: ASB
 
+    @property
+    def model(self) -> Model:
+        return self._model
+
+    @model.setter
+    def model(self, model: Model):
+        self._model = model
+        self.capabilities = capabilities_for(model, self._version)
+
+    @property
+    def version(self) -> str:
+        return self._version
+
+    @version.setter
+    def version(self, version: str):
+        # the command tables follow the firmware the printer reports
+        self._version = version
+        self.capabilities = capabilities_for(self._model, version)
+
     @abstractmethod
     async def connect(self, address: str):
         pass
@@ -41,12 +90,23 @@ class StarPRNT(ABC):
     async def write_raw(self, data: bytes):
         pass
 
+    @property
+    def encoder(self) -> TextEncoder:
+        return encoder_for(self.model, self.code_page)
+
+    def _encode(self, data: str) -> bytes:
+        return encoder_for(self.model, self.code_page).encode(data)
+
     async def print(self, data: str):
-        await self.write_raw(data.encode())
+        await self.write_raw(self._encode(data))
 
     async def print_line(self, data: str):
         await self.print(data + "\n")
 
+    async def print_lines(self, lines: Iterable[str]):
+        # encoded into one buffer and written once, however many lines there are
+        await self.write_raw(self.encoder.encode_lines(lines))
+
     # 2.3.1 Font style and character set
 
     async def set_font(self, font: Font):
@@ -59,6 +119,12 @@ class StarPRNT(ABC):
             command += b"\x02"
         await self.write_raw(command)
 
+    async def set_code_page(self, code_page: CodePage):
+        if code_page not in CODE_PAGES:
+            raise ValueError("invalid code page")
+        await self.write_raw(b"\x1b\x1dt" + bytes([CODE_PAGES[code_page]]))
+        # text is encoded for the selected code page from now on, on every model
+        self.code_page = code_page
 
     async def set_font_scale(self, width: int, height: int):
         if not 1 <= width <= 6 or not 1 <= height <= 6:
@@ -97,97 +163,132 @@ class StarPRNT(ABC):
             else:
                 await self.write_raw(b"\xaa" * 72)
 
-    async def print_image(self, image: str | BytesIO, alignment: ImageAlignment = ImageAlignment.Center):
-        with Image.open(image) as img:
-            width, height = img.size
-            if img.mode == "RGBA":
-                bg = Image.new("RGBA", (width, height), (255, 255, 255, 255))
-                img = Image.alpha_composite(bg, img)
-            if width > 576:
-                img = img.resize((576, height * 576 // width), Image.LANCZOS)
-                width, height = img.size
-
-            if img.mode == "RGB" or img.mode == "RGBA":
-                # convert to luma with BT.709
-                new_img = Image.new("L", img.size)
-                img_data = img.getdata()
-                new_img.putdata([round((((0.2126 * pixel[0] + 0.7152 * pixel[1] + 0.0722 * pixel[2]) / 255) ** (1 / 2.2)) ** 1.5 * 255) for pixel in img_data])
-                img = new_img
-            elif img.mode not in ("1", "L"):
-                # convert to grayscale with Pillow directly
-                img = img.convert("L")
-            if img.mode == "L":
-                new_img = Image.new("1", img.size)
-                img_data = list(img.getdata())
-                img_data = [img_data[i * width:(i + 1) * width] for i in range(height)]
-                # completely non-optimized snake sierra-3
-                for y in range(height):
-                    if y % 2 == 0:
-                        for x in range(width):
-                            old_pixel = img_data[y][x]
-                            new_pixel = 0 if old_pixel < 128 else 255
-                            error = old_pixel - new_pixel
-                            new_img.putpixel((x, y), 1 if new_pixel < 128 else 0)
-                            if x + 1 < width:
-                                img_data[y][x + 1] += error * 5 / 32
-                            if x + 2 < width:
-                                img_data[y][x + 2] += error * 3 / 32
-                            if y + 1 < height:
-                                if x - 2 >= 0:
-                                    img_data[y + 1][x - 2] += error * 2 / 32
-                                if x - 1 >= 0:
-                                    img_data[y + 1][x - 1] += error * 4 / 32
-                                img_data[y + 1][x] += error * 5 / 32
-                                if x + 1 < width:
-                                    img_data[y + 1][x + 1] += error * 4 / 32
-                                if x + 2 < width:
-                                    img_data[y + 1][x + 2] += error * 2 / 32
-                                if y + 2 < height:
-                                    if x - 1 >= 0:
-                                        img_data[y + 2][x - 1] += error * 2 / 32
-                                    img_data[y + 2][x] += error * 3 / 32
-                                    if x + 1 < width:
-                                        img_data[y + 2][x + 1] += error * 2 / 32
-                    else:
-                        for x in range(width - 1, -1, -1):
-                            old_pixel = img_data[y][x]
-                            new_pixel = 0 if old_pixel < 128 else 255
-                            error = old_pixel - new_pixel
-                            new_img.putpixel((x, y), 1 if new_pixel < 128 else 0)
-                            if x - 1 >= 0:
-                                img_data[y][x - 1] += error * 5 / 32
-                            if x - 2 >= 0:
-                                img_data[y][x - 2] += error * 3 / 32
-                            if y + 1 < height:
-                                if x + 2 < width:
-                                    img_data[y + 1][x + 2] += error * 2 / 32
-                                if x + 1 < width:
-                                    img_data[y + 1][x + 1] += error * 4 / 32
-                                img_data[y + 1][x] += error * 5 / 32
-                                if x - 1 >= 0:
-                                    img_data[y + 1][x - 1] += error * 4 / 32
-                                if x - 2 >= 0:
-                                    img_data[y + 1][x - 2] += error * 2 / 32
-                                if y + 2 < height:
-                                    if x + 1 < width:
-                                        img_data[y + 2][x + 1] += error * 2 / 32
-                                    img_data[y + 2][x] += error * 3 / 32
-                                    if x - 1 >= 0:
-                                        img_data[y + 2][x - 1] += error * 2 / 32
-                img = new_img
-            if width % 8 != 0:
-                padded = Image.new("1", (width + 8 - width % 8, height), 255)
-                padded.paste(img, (0, 0))
-                img = padded
-                width, height = img.size
-            if alignment == ImageAlignment.Center:
-                img = ImageOps.expand(img, (288 - width // 2, 0, 288 - width // 2, 0))
-                width, height = img.size
-            elif alignment == ImageAlignment.Right:
-                img = ImageOps.expand(img, (0, 0, 576 - width, 0))
-                width, height = img.size
-            data = img.tobytes()
-            await self.write_raw(b"\x1b\x1dS\x01" + pack("<HH", width // 8, height) + b"\x00" + data)
+    async def print_image(self, image: str | BytesIO, alignment: ImageAlignment = ImageAlignment.Center,
+                          dithering: DitherAlgorithm = DitherAlgorithm.Sierra3, width: int = 576,
+                          band_height: int | None = None, gamma: float | None = None, contrast: float | None = None):
+        if gamma is None:
+            gamma = self.image_gamma
+        if contrast is None:
+            contrast = self.image_contrast
+        if band_height is not None:
+            await self._print_image_bands(image, alignment, dithering, width, band_height, gamma, contrast)
+            return
+        loop = asyncio.get_running_loop()
+        key = None
+        if self.raster_cache is not None:
+            def read_and_hash() -> tuple[bytes, str]:
+                source = image.getvalue() if isinstance(image, BytesIO) else pathlib.Path(image).read_bytes()
+                return source, self.raster_cache.key(source, alignment, dithering, width, gamma, contrast,
+                                                     self.image_trim)
+
+            # reading and hashing a photo sized file would stall the loop as well, done in the default thread pool
+            source, key = await loop.run_in_executor(None, read_and_hash)
+            if (data := await self.raster_cache.fetch(key)) is not None:
+                self.metrics.count("image.cache_hits")
+                await self.write_raw(data)
+                return
+            image = BytesIO(source)
+        # decoding and dithering are CPU bound, keep them off the event loop
+        data, timings, sizes = await loop.run_in_executor(self.executor, partial(rasterize_timed, image, alignment, dithering, width, gamma, contrast, self.image_trim))
+        for stage, seconds in timings.items():
+            self.metrics.timing("image." + stage, seconds)
+        self._count_sizes(sizes)
+        if key is not None:
+            await self.raster_cache.save(key, data)
+        await self.write_raw(data)
+
+    async def print_text_image(self, text: str, alignment: ImageAlignment = ImageAlignment.Left, rtl: bool = False,
+                               renderer: TextRenderer | None = None):
+        # text the printer fonts can't do, drawn here and sent as raster like print_image
+        if renderer is None:
+            if self.text_renderer is None:
+                self.text_renderer = TextRenderer()
+            renderer = self.text_renderer
+        # the glyph cache lives in this process, keep off process pools
+        executor = None if isinstance(self.executor, ProcessPoolExecutor) else self.executor
+        sizes = {}
+        start = time.perf_counter()
+        data = await asyncio.get_running_loop().run_in_executor(
+            executor, partial(renderer.rasterize, text, alignment, rtl, self.image_trim, sizes))
+        self.metrics.timing("image.text", time.perf_counter() - start)
+        self._count_sizes(sizes)
+        await self.write_raw(data)
+
+    async def _print_image_bands(self, image: str | BytesIO, alignment: ImageAlignment, dithering: DitherAlgorithm,
+                                 width: int, band_height: int, gamma: float | None, contrast: float):
+        # the next band is computed while the current one is being sent, bands are never cached
+        # a generator can't be moved to another process, fall back to the default thread pool
+        executor = None if isinstance(self.executor, ProcessPoolExecutor) else self.executor
+        loop = asyncio.get_running_loop()
+        timings = {}
+        sizes = {}
+        bands = rasterize_bands(image, alignment, dithering, width, band_height, gamma, contrast, timings,
+                                self.image_trim, sizes)
+        pending = loop.run_in_executor(executor, next, bands, None)
+        try:
+            while (band := await pending) is not None:
+                pending = loop.run_in_executor(executor, next, bands, None)
+                await self.write_raw(band)
+        finally:
+            if not pending.done():
+                await asyncio.wait([pending])
+            bands.close()
+            for stage, seconds in timings.items():
+                self.metrics.timing("image." + stage, seconds)
+            self._count_sizes(sizes)
+
+    def _count_sizes(self, sizes: dict[str, int]):
+        # raster bytes as sent, and what trimming saved over the full bitmap
+        if sizes:
+            self.metrics.count("image.bytes", sizes["sent"])
+            self.metrics.count("image.bytes_saved", sizes["raw"] - sizes["sent"])
+
+    # NV logos
+
+    async def define_logos(self, images: Iterable[str | BytesIO], dithering: DitherAlgorithm = DitherAlgorithm.Sierra3,
+                           width: int = 576, gamma: float | None = None, contrast: float = 1.0):
+        # ESC FS q n: stores the images as logos 1..n in non-volatile memory, replacing all logos defined before;
+        # flash has limited write cycles, LogoRegistry keeps track so this only runs when something changed
+        loop = asyncio.get_running_loop()
+        blocks = await asyncio.gather(*(loop.run_in_executor(self.executor, partial(nv_image, image, dithering, width,
+                                                                                    gamma, contrast))
+                                        for image in images))
+        if not 1 <= len(blocks) <= 255:
+            raise ValueError("logo count out of range (1-255)")
+        await self.write_raw(b"\x1b\x1cq" + bytes([len(blocks)]) + b"".join(blocks))
+
+    async def print_logo(self, logo: int | str, double_width: bool = False, double_height: bool = False):
+        # ESC FS p n m, by number or by the name it was registered under
+        if isinstance(logo, str):
+            if logo not in self.logos:
+                raise ValueError("unknown logo")
+            logo = self.logos[logo]
+        if not 1 <= logo <= 255:
+            raise ValueError("logo number out of range (1-255)")
+        await self.write_raw(b"\x1b\x1cp" + bytes([logo, double_width | double_height << 1]))
+
+    # Bar codes and two-dimensional codes
+
+    async def print_barcode(self, data: str, symbology: Barcode = Barcode.Code128, mode: int = 2, height: int = 80,
+                            hri: bool = True, alignment: ImageAlignment = ImageAlignment.Left):
+        # mode is n3 of ESC b, the module / wide-narrow ratio setting of the symbology; height in dots
+        await self.write_raw(barcode_command(data, symbology, mode, height, hri, alignment))
+
+    async def print_qr_code(self, data: str | bytes, correction: QRErrorCorrection = QRErrorCorrection.M,
+                            cell_size: int = 4, alignment: ImageAlignment = ImageAlignment.Left):
+        await self.write_raw(qr_command(data, correction, cell_size, alignment))
+
+    async def print_pdf417(self, data: str | bytes, ecc: int = 1, module: int = 2, aspect: int = 3,
+                           alignment: ImageAlignment = ImageAlignment.Left):
+        await self.write_raw(pdf417_command(data, ecc, module, aspect, alignment))
+
+    # 2.3.16 Status
+
+    async def update_etb(self):
+        await self.write_raw(b"\x17")
+
+    async def reset_etb_counter(self):
+        await self.write_raw(b"\x1b\x1eE\x00")
 
     # 2.3.18 Initialization
 
@@ -197,182 +298,360 @@ class StarPRNT(ABC):
     # 2.3.21 Print settings
 
     async def set_print_speed(self, speed: PrintSpeed):
-        command = b"\x1b\x1er"
-        if self.model in (Model.SM_L200, Model.SM_L300, Model.mC_Print2):
+        table = self.capabilities.print_speed
+        if table is None:
             raise ValueError("model doesn't support this command")
-        if self.model in (Model.mC_Print3_G1, Model.TSP100, Model.mC_Label3, Model.mC_Print3_G2):
-            # Type 1
-            if speed == PrintSpeed.Fast:
-                command += b"\x00"
-            elif speed == PrintSpeed.Normal:
-                command += b"\x01"
-            elif speed == PrintSpeed.Slow:
-                command += b"\x02"
-            else:
-                raise ValueError("invalid speed")
-        elif self.model == Model.mPOP:
-            # Type 2
-            if speed == PrintSpeed.Fast:
-                command += b"\x00"
-            elif speed == PrintSpeed.Slow:
-                command += b"\x02"
-            else:
-                raise ValueError("invalid speed")
-        elif self.model == Model.SM_S_T:
-            # Type 3
-            if speed == PrintSpeed.Fast:
-                command += b"\x02"
-            elif speed == PrintSpeed.Normal:
-                command += b"\x01"
-            elif speed == PrintSpeed.Slow:
-                command += b"\x00"
-            else:
-                raise ValueError("invalid speed")
-        else:
-            raise ValueError("model not supported")
-        await self.write_raw(command)
+        if speed not in table:
+            raise ValueError("invalid speed")
+        await self.write_raw(table[speed])
 
     async def set_print_density(self, density: PrintDensity):
-        command = b"\x1b\x1ed"
-        if self.model in (Model.mPOP, Model.TSP100, Model.mC_Label3) \
-            or self.model == Model.mC_Print3_G1 and self.version <= "2.4":
-            # Type 1
-            table = {
-                PrintDensity.Plus3: "0",
-                PrintDensity.Plus2: "1",
-                PrintDensity.Plus1: "2",
-                PrintDensity.Standard: "3",
-                PrintDensity.Minus1: "4",
-                PrintDensity.Minus2: "5",
-                PrintDensity.Minus3: "6",
-            }
-        elif self.model == Model.mC_Print2:
-            # Type 2
-            table = {
-                PrintDensity.Plus3: "0",
-                PrintDensity.Plus2: "1",
-                PrintDensity.Plus1: "2",
-                PrintDensity.Standard: "3",
-            }
-        elif self.model in (Model.SM_L200, Model.SM_L300):
-            # Type 3
-            table = {
-                PrintDensity.Medium: "0",
-                PrintDensity.Low: "1",
-                PrintDensity.High: "2",
-                PrintDensity.Special: "3",
-            }
-        elif self.model == Model.SM_S_T:
-            # Type 4
-            table = {
-                PrintDensity.Medium: "0",
-                PrintDensity.Low: "1",
-                PrintDensity.High: "2",
-            }
-        elif self.model == Model.mC_Print3_G1 and self.version >= "3.0" \
-            or self.model == Model.mC_Print3_G2:
-            # Type 5
-            table = {
-                PrintDensity.Plus3: "0",
-                PrintDensity.Plus2: "1",
-                PrintDensity.Plus1: "2",
-                PrintDensity.Standard: "3",
-                PrintDensity.Minus1: "4",
-                PrintDensity.Minus2: "5",
-                PrintDensity.Minus3: "6",
-                PrintDensity.Plus4: "7",
-            }
-        else:
-            raise ValueError("model not supported")
+        table = self.capabilities.print_density
+        if table is None:
+            raise ValueError("model doesn't support this command")
         if density not in table:
             raise ValueError("invalid density for model")
-        command += bytes([ord(table[density])])
-        await self.write_raw(command)
+        await self.write_raw(table[density])
 
     # 2.3.23 UTF related commands
 
     async def set_utf8_font(self, font: UTF8Font):
-        if self.model in (Model.mPOP, Model.SM_L200, Model.SM_L300, Model.SM_S_T):
+        table = self.capabilities.utf8_font
+        if table is None:
             raise ValueError("model doesn't support this command")
-        if font == UTF8Font.Japanese:
-            font_order = [1, 2, 3, 4]
-        elif font == UTF8Font.SimplifiedChinese:
-            font_order = [2, 3, 1, 4]
-        elif font == UTF8Font.TraditionalChinese:
-            font_order = [3, 2, 1, 4]
-        elif font == UTF8Font.Korean:
-            font_order = [4, 1, 2, 3]
-        else:
+        if font not in table:
             raise ValueError("invalid font")
-        await self.write_raw(b"\x1b\x1d)U\x05\x00A" + bytes(font_order))
+        await self.write_raw(table[font])
 
     # 2.3.26 External device control
 
     async def trigger_external_device_1(self):
-        if self.model in (Model.SM_L200, Model.SM_L300, Model.SM_S_T):
+        command = self.capabilities.external_device_1
+        if command is None:
             raise ValueError("model doesn't support this command")
-        await self.write_raw(b"\x07")
+        await self.write_raw(command)
 
     async def trigger_external_device_2(self):
-        if self.model in (Model.SM_L200, Model.SM_L300, Model.SM_S_T) \
-            or self.model == Model.mPOP and self.version < "2.0":
+        command = self.capabilities.external_device_2
+        if command is None:
             raise ValueError("model doesn't support this command")
-        await self.write_raw(b"\x1a")
+        await self.write_raw(command)
 
 
-class StarPRNTEthernet(StarPRNT):
+class PrinterInfo(NamedTuple):
+    model: Model
+    version: str
 
-    def __init__(self, interface_type: StarPRNT.InterfaceType, address: IPv4Address,
-                 reader: StreamReader, writer: StreamWriter, reset: bool = False, model: Model = Model.Unknown):
-        super().__init__(interface_type, model)
-        self.address = address
-        self._reader = reader
-        self._writer = writer
+
+class StarPRNTConnection(StarPRNT):
+    # a live printer behind any transport: handshake, ASB status, ETB tracking and spooler flow control
+    # transport address -> what the handshake found out last time, reconnects skip the version request
+    probes: dict[str, PrinterInfo] = {}
+
+    def __init__(self, interface_type: StarPRNT.InterfaceType, transport: Transport, reset: bool = False,
+                 model: Model = Model.Unknown, executor: Executor | None = None):
+        super().__init__(interface_type, model, executor)
+        self.transport = transport
         self._reset = reset
+        self._asb_parser = ASBParser()
+        # called with (status, changed field names) whenever a frame differs from the previous one
+        self.status_listeners: list[StatusListener] = []
+        self._subscriptions: WeakSet[StatusSubscription] = WeakSet()
+        # ETBs written since the counter was reset and ETBs the printer has reported back, both absolute
+        self._etb_sent = 0
+        self._etb_done = 0
+        # last raw 5 bit counter the printer reported, None until it shows the handshake's reset
+        self._etb_counter: int | None = None
+        self._etb_waiters: list[tuple[int, asyncio.Future]] = []
+        # cleared while the printer reports its spooler buffer as full
+        self._spooler_ready = asyncio.Event()
+        self._spooler_ready.set()
+        # a write goes out in chunks, other writers must not get in between them mid command
+        self._write_lock = asyncio.Lock()
+        # the handshake is done once the first ASB and the version reply are in
+        self._status_seen = asyncio.Event()
+        self._version_seen = asyncio.Event()
         self._read_task = asyncio.create_task(self._read_worker())
         self.status = ASB()
 
     async def _read_worker(self):
-        if self._reset:
-            await self.write_raw(b"\x1b@")
-        await self.write_raw(b"\x1b#*\n\0")
-        await self.write_raw(b"\x1b\x1d)I\x01\x001")
+        # reset, ETB counter reset, ASB enable and version request in a single write; the counter is reset
+        # first so the first ASB already reports 0 instead of whatever an earlier session left behind
+        handshake = b"\x1b@" if self._reset else b""
+        handshake += b"\x1b\x1eE\x00\x1b#*\n\0"
+        if not self._version_seen.is_set():
+            handshake += b"\x1b\x1d)I\x01\x001"
+        await self.write_raw(handshake)
         while True:
             try:
-                asb = await self._reader.read(524288)
-                self.status, extra = parse_asb(asb)
-                if extra is not None:
-                    print(extra)
-                    if "printer_version" in extra:
-                        self.version = extra["printer_version"].split("Ver")[1]
+                data = await self.transport.read()
+                if not data:
+                    raise ConnectionError("connection closed by printer")
+                for status, extra in self._asb_parser.feed(data):
+                    self.metrics.count("asb.frames")
+                    changed = status.changes(self.status)
+                    self.status = status
+                    if status.spooler_buffer_full:
+                        self._spooler_ready.clear()
+                    else:
+                        self._spooler_ready.set()
+                    if status.etb_counter is not None:
+                        self._advance_etb(status.etb_counter)
+                    if changed:
+                        for name in changed:
+                            self.metrics.count("asb.change." + name)
+                        for listener in tuple(self.status_listeners):
+                            # a failing callback is the caller's bug, it must not take the connection down
+                            try:
+                                listener(status, changed)
+                            except Exception as e:
+                                self.metrics.event("asb.listener_error", e)
+                    if extra is not None:
+                        self.metrics.event("asb.extra", extra)
+                        if "printer_version" in extra:
+                            self.version = extra["printer_version"].split("Ver")[1]
+                            self._version_seen.set()
+                    self._status_seen.set()
             except:
+                for _, waiter in self._etb_waiters:
+                    if not waiter.done():
+                        waiter.set_exception(ConnectionError("connection closed"))
+                self._etb_waiters.clear()
+                for subscription in list(self._subscriptions):
+                    subscription.close()
                 await self.close()
                 raise
 
-    @classmethod
-    async def connect(cls, address: str, model: Model = Model.Unknown, reset = False):
+    async def wait_ready(self, timeout: float | None = None):
+        # returns once the handshake is done, model and version dependent commands are safe after this
+        async def handshake():
+            await self._status_seen.wait()
+            await self._version_seen.wait()
+
+        ready = asyncio.create_task(handshake())
         try:
-            address = IPv4Address(address)
-        except ValueError:
-            raise ValueError("invalid IP address")
+            await asyncio.wait([ready, self._read_task], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            ready.cancel()
+        if self._status_seen.is_set() and self._version_seen.is_set():
+            return
+        if self._read_task.done():
+            raise ConnectionError("connection closed during handshake")
+        raise TimeoutError("printer did not answer the handshake in time")
+
+    def subscribe(self, *fields: str) -> StatusSubscription:
+        # fields are ASB field names or glob patterns, e.g. "paper_near_end_*" or *ERRORS; none means all
+        subscription = StatusSubscription(self.status_listeners, *fields)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def on_status(self, callback: StatusListener, *fields: str) -> Callable[[], None]:
+        # filtered callback, returns a function that unregisters it
+        selected = field_filter(fields)
+
+        def listener(status: ASB, changed: list[str]):
+            if selected is not None:
+                changed = [name for name in changed if name in selected]
+                if not changed:
+                    return
+            callback(status, changed)
+
+        self.status_listeners.append(listener)
+        return lambda: self.status_listeners.remove(listener)
+
+    async def wait_until(self, timeout: float | None = None, **conditions: Any) -> ASB:
+        # e.g. await conn.wait_until(online=True, cover_open=False), sleeps until the ASB says so
+        for name in conditions:
+            if name not in FIELDS:
+                raise ValueError(f"unknown status field {name}")
+
+        def matches(status: ASB) -> bool:
+            return all(getattr(status, name) == value for name, value in conditions.items())
+
+        # subscribed before looking at the current status, so no frame can slip in between
+        subscription = self.subscribe(*conditions)
+        if matches(self.status):
+            subscription.close()
+            return self.status
+        if self._read_task.done():
+            subscription.close()
+            raise ConnectionError("connection closed")
+
+        async def wait() -> ASB:
+            async for event in subscription:
+                if matches(event.status):
+                    return event.status
+            raise ConnectionError("connection closed")
+
         try:
-            reader, writer = await asyncio.wait_for(asyncio.open_connection(str(address), 9100), timeout=5)
+            return await asyncio.wait_for(wait(), timeout)
         except asyncio.TimeoutError:
-            raise TimeoutError("connection timed out")
-        except ConnectionRefusedError:
-            raise ConnectionRefusedError("connection refused")
+            raise TimeoutError("status condition not reached in time")
+        finally:
+            subscription.close()
+
+    def _advance_etb(self, counter: int):
+        # the printer's counter is 5 bits wide, assumes fewer than 32 ETBs are outstanding.
+        # After a reset, frames still carrying the old count are skipped until one reports 0
+        if self._etb_counter is None:
+            if counter == 0:
+                self._etb_counter = 0
+            return
+        self._etb_done = min(self._etb_done + (counter - self._etb_counter) % 32, self._etb_sent)
+        self._etb_counter = counter
+        if not self._etb_waiters:
+            return
+        pending = []
+        for sequence, waiter in self._etb_waiters:
+            if sequence <= self._etb_done:
+                if not waiter.done():
+                    waiter.set_result(None)
+            else:
+                pending.append((sequence, waiter))
+        self._etb_waiters = pending
+
+    async def update_etb(self):
+        # counted like the ones wait_printed sends, or the printer reporting it would confirm someone else's
+        self._etb_sent += 1
+        await self.write_raw(b"\x17")
+
+    async def reset_etb_counter(self):
+        # ETBs still outstanding can't be told apart from the reset anymore, their waiters fail
+        for _, waiter in self._etb_waiters:
+            if not waiter.done():
+                waiter.set_exception(RuntimeError("ETB counter reset before the job was confirmed"))
+        self._etb_waiters.clear()
+        self._etb_done = self._etb_sent
+        self._etb_counter = None
+        await self.write_raw(b"\x1b\x1eE\x00")
+
+    async def wait_printed(self, timeout: float | None = None):
+        # sends an ETB and returns once the printer reports having processed it,
+        # i.e. everything written before this call has been printed
+        waiter = asyncio.get_running_loop().create_future()
+        self._etb_waiters.append((self._etb_sent + 1, waiter))
+        await self.update_etb()
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError("printer did not confirm the job in time")
 
-        res = cls(cls.InterfaceType.Ethernet, address, reader, writer, reset, model)
-        await asyncio.sleep(0.5)
+    @classmethod
+    async def open(cls, transport: Transport, model: Model = Model.Unknown, reset = False,
+                   executor: Executor | None = None, metrics: Metrics = NULL_METRICS, timeout: float = 5.0,
+                   interface_type: StarPRNT.InterfaceType = StarPRNT.InterfaceType.Ethernet,
+                   **kwargs) -> "StarPRNTConnection":
+        # runs the handshake on an open transport, closes it again if the printer doesn't answer in time
+        probe = cls.probes.get(transport.address)
+        if probe is not None and model == Model.Unknown:
+            model = probe.model
+        res = cls(interface_type, transport, reset, model, executor, **kwargs)
+        res.metrics = metrics
+        if probe is not None and probe.model == model:
+            res.version = probe.version
+            res._version_seen.set()
+        try:
+            await res.wait_ready(timeout)
+        except BaseException:
+            await res.close()
+            await res.wait_closed()
+            raise
+        cls.probes[transport.address] = PrinterInfo(res.model, res.version)
         return res
 
+    @classmethod
+    async def connect(cls, transport: Transport, *args, **kwargs) -> "StarPRNTConnection":
+        # subclasses open their own kind of transport from an address, here it's passed in ready made
+        return await cls.open(transport, *args, **kwargs)
+
     async def write_raw(self, data: bytes):
-        if self._writer.is_closing():
-            raise ConnectionError("connection closed")
-        self._writer.write(data)
-        await self._writer.drain()
+        start = time.perf_counter()
+        chunk = self.transport.chunk_size
+        view = memoryview(data)
+        async with self._write_lock:
+            if self.transport.is_closing():
+                raise ConnectionError("connection closed")
+            for offset in range(0, len(data), chunk):
+                if not self._spooler_ready.is_set():
+                    # hold off until the printer has room again instead of overrunning it
+                    waited = time.perf_counter()
+                    await self._spooler_ready.wait()
+                    self.metrics.timing("conn.spooler_wait", time.perf_counter() - waited)
+                    if self.transport.is_closing():
+                        raise ConnectionError("connection closed")
+                await self.transport.write(view[offset:offset + chunk] if len(data) > chunk else data)
+        self.metrics.timing("conn.send", time.perf_counter() - start)
+        self.metrics.count("conn.writes")
+        self.metrics.count("conn.bytes", len(data))
 
     async def close(self):
-        if not self._writer.is_closing():
-            self._writer.close()
-            await self._writer.wait_closed()
\ No newline at end of file
+        if self._read_task is not asyncio.current_task():
+            self._read_task.cancel()
+        # wake up writers waiting on the spooler, they will see the connection closing
+        self._spooler_ready.set()
+        await self.transport.close()
+
+    async def wait_closed(self):
+        # returns once the connection is gone, closed locally or dropped by the printer
+        await asyncio.wait([self._read_task])
+        if not self._read_task.cancelled():
+            self._read_task.exception()
+
+
+class StarPRNTEthernet(StarPRNTConnection):
+
+    def __init__(self, interface_type: StarPRNT.InterfaceType, transport: Transport, reset: bool = False,
+                 model: Model = Model.Unknown, executor: Executor | None = None, address: IPv4Address | None = None):
+        super().__init__(interface_type, transport, reset, model, executor)
+        self.address = address
+
+    @classmethod
+    async def connect(cls, address: str, model: Model = Model.Unknown, reset = False, executor: Executor | None = None,
+                      metrics: Metrics = NULL_METRICS, port: int = 9100, timeout: float = 5.0) -> "StarPRNTEthernet":
+        # timeout covers opening the socket and the handshake together
+        start = time.perf_counter()
+        try:
+            address = IPv4Address(address)
+        except ValueError:
+            raise ValueError("invalid IP address")
+        transport = await open_tcp(str(address), port, timeout)
+        res = await cls.open(transport, model, reset, executor, metrics,
+                             max(timeout - (time.perf_counter() - start), 0), cls.InterfaceType.Ethernet,
+                             address=address)
+        metrics.timing("conn.connect", time.perf_counter() - start)
+        return res
+
+    @classmethod
+    async def connect_many(cls, addresses: Iterable[str], model: Model = Model.Unknown, reset = False,
+                           executor: Executor | None = None, metrics: Metrics = NULL_METRICS, port: int = 9100,
+                           timeout: float = 5.0) -> list["StarPRNTEthernet | Exception"]:
+        # connects to all addresses at once, a printer that fails shows up as its exception in the result
+        return await asyncio.gather(*(cls.connect(address, model, reset, executor, metrics, port, timeout)
+                                      for address in addresses), return_exceptions=True)
+
+
+class StarPRNTUSB(StarPRNTConnection):
+
+    @classmethod
+    async def connect(cls, address: str = "/dev/usb/lp0", model: Model = Model.Unknown, reset = False,
+                      executor: Executor | None = None, metrics: Metrics = NULL_METRICS,
+                      timeout: float = 5.0) -> "StarPRNTUSB":
+        # address is the usblp device file, the printer has to be in its bidirectional mode for ASB
+        start = time.perf_counter()
+        res = await cls.open(DeviceTransport(address), model, reset, executor, metrics, timeout, cls.InterfaceType.USB)
+        metrics.timing("conn.connect", time.perf_counter() - start)
+        return res
+
+
+class StarPRNTBluetooth(StarPRNTConnection):
+
+    @classmethod
+    async def connect(cls, address: str, model: Model = Model.Unknown, reset = False, executor: Executor | None = None,
+                      metrics: Metrics = NULL_METRICS, channel: int = 1, timeout: float = 10.0) -> "StarPRNTBluetooth":
+        # address is the printer's Bluetooth MAC, paired beforehand
+        start = time.perf_counter()
+        transport = await open_rfcomm(address, channel, timeout)
+        res = await cls.open(transport, model, reset, executor, metrics,
+                             max(timeout - (time.perf_counter() - start), 0), cls.InterfaceType.Bluetooth)
+        metrics.timing("conn.connect", time.perf_counter() - start)
+        return res
@@ -0,0 +1,144 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+
+from .enums import DitherAlgorithm
+
+# error diffusion kernels: (divisor, [(dy, dx, weight), ...]) for a left-to-right scan
+_KERNELS = {
+    DitherAlgorithm.Sierra3: (32, [
+        (0, 1, 5), (0, 2, 3),
+        (1, -2, 2), (1, -1, 4), (1, 0, 5), (1, 1, 4), (1, 2, 2),
+        (2, -1, 2), (2, 0, 3), (2, 1, 2),
+    ]),
+    DitherAlgorithm.FloydSteinberg: (16, [
+        (0, 1, 7),
+        (1, -1, 3), (1, 0, 5), (1, 1, 1),
+    ]),
+    DitherAlgorithm.Atkinson: (8, [
+        (0, 1, 1), (0, 2, 1),
+        (1, -1, 1), (1, 0, 1), (1, 1, 1),
+        (2, 0, 1),
+    ]),
+}
+
+_BAYER_8 = np.array([
+    [0, 32, 8, 40, 2, 34, 10, 42],
+    [48, 16, 56, 24, 50, 18, 58, 26],
+    [12, 44, 4, 36, 14, 46, 6, 38],
+    [60, 28, 52, 20, 62, 30, 54, 22],
+    [3, 35, 11, 43, 1, 33, 9, 41],
+    [51, 19, 59, 27, 49, 17, 57, 25],
+    [15, 47, 7, 39, 13, 45, 5, 37],
+    [63, 31, 55, 23, 61, 29, 53, 21],
+], dtype=np.float64)
+_BAYER_THRESHOLD = (_BAYER_8 + 0.5) * (256 / 64)
+
+
+class _Diffuser:
+    # serpentine error diffusion keeping only the rows the kernel reaches below the current one
+
+    def __init__(self, width: int, algorithm: DitherAlgorithm, threshold: int = 128):
+        divisor, kernel = _KERNELS[algorithm]
+        self.width = width
+        self.threshold = threshold
+        self.row_weights = [w / divisor for dy, dx, w in kernel if dy == 0]
+        # per following row: list of (dx, weight), applied with a vectorized shifted add
+        depth = max(dy for dy, dx, w in kernel)
+        self.below = [[(dx, w / divisor) for dy, dx, w in kernel if dy == d] for d in range(1, depth + 1)]
+        self.carry = np.zeros((depth, width), dtype=np.float64)
+        self.y = 0
+
+    def process(self, rows: np.ndarray) -> np.ndarray:
+        height, width = rows.shape
+        out = np.empty((height, width), dtype=bool)
+        for i in range(height):
+            line = rows[i].astype(np.float64) + self.carry[0]
+            self.carry[:-1] = self.carry[1:]
+            self.carry[-1] = 0
+            reverse = self.y % 2 == 1
+            if reverse:
+                line = line[::-1]
+            dots, error = self._scan(line.tolist())
+            dots = np.array(dots, dtype=bool)
+            error = np.array(error, dtype=np.float64)
+            if reverse:
+                dots = dots[::-1]
+                error = error[::-1]
+            out[i] = dots
+            self._spread(error, reverse)
+            self.y += 1
+        return out
+
+    def _scan(self, line: list[float]) -> tuple[list[bool], list[float]]:
+        # the only inherently sequential part: error carried to the right within the row
+        threshold = self.threshold
+        w1, w2 = (self.row_weights + [0.0, 0.0])[:2]
+        n = len(line)
+        dots = [False] * n
+        errors = [0.0] * n
+        c1 = c2 = 0.0
+        for x in range(n):
+            value = line[x] + c1
+            if value < threshold:
+                dots[x] = True
+                error = value
+            else:
+                error = value - 255
+            errors[x] = error
+            c1 = c2 + error * w1
+            c2 = error * w2
+        return dots, errors
+
+    def _spread(self, error: np.ndarray, reverse: bool):
+        width = self.width
+        for d, taps in enumerate(self.below):
+            target = self.carry[d]
+            for dx, weight in taps:
+                if reverse:
+                    dx = -dx
+                if dx >= 0:
+                    target[dx:] += error[:width - dx] * weight
+                else:
+                    target[:dx] += error[-dx:] * weight
+
+
+class Ditherer:
+    # dithers an image band by band, carrying diffused error and the ordered pattern phase
+    # across calls so the bands join up exactly as if the image was dithered in one go
+
+    def __init__(self, width: int, algorithm: DitherAlgorithm = DitherAlgorithm.Sierra3, threshold: int = 128):
+        if algorithm in _KERNELS:
+            self._diffuser = _Diffuser(width, algorithm, threshold)
+        elif algorithm in (DitherAlgorithm.Ordered, DitherAlgorithm.Threshold):
+            self._diffuser = None
+        else:
+            raise ValueError("invalid dithering algorithm")
+        self.algorithm = algorithm
+        self.threshold = threshold
+        self.y = 0
+
+    def dither(self, luma: np.ndarray) -> np.ndarray:
+        # luma: 2D uint8 array, returns a bool array where True is a printed (black) dot
+        height, width = luma.shape
+        if self._diffuser is not None:
+            dots = self._diffuser.process(luma)
+        elif self.algorithm == DitherAlgorithm.Threshold:
+            dots = luma < self.threshold
+        else:
+            phase = self.y % 8
+            tiled = np.tile(_BAYER_THRESHOLD, ((phase + height + 7) // 8, (width + 7) // 8))
+            dots = luma < tiled[phase:phase + height, :width]
+        self.y += height
+        return dots
+
+
+def dither(luma: np.ndarray, algorithm: DitherAlgorithm = DitherAlgorithm.Sierra3, threshold: int = 128) -> np.ndarray:
+    return Ditherer(luma.shape[1], algorithm, threshold).dither(luma)
+
+
+def pack(dots: np.ndarray) -> bytes:
+    # one bit per dot, MSB first, rows padded to a whole byte with blank dots
+    return np.packbits(dots, axis=1).tobytes()
@@ -0,0 +1,327 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import asyncio
+from struct import pack, unpack
+
+
+def _seven_bit(value: int) -> int:
+    # inverse of the ASB size / counter encoding, bit 0 and bit 4 stay clear
+    return ((value & 0b111) << 1) | ((value & 0b11000) << 2)
+
+
+# fixed length commands: prefix -> total length
+_FIXED = {
+    b"\x1b@": 2,
+    b"\x1b#*\n\x00": 5,
+    b"\x1b\x1eE": 4,
+    b"\x1b\x1eF": 4,
+    b"\x1b\x1er": 4,
+    b"\x1b\x1ed": 4,
+    b"\x1bi": 4,
+    b"\x1bd": 3,
+    b"\x1bJ": 3,
+    b"\x1b\x1dc": 5,
+    b"\x1b\x1dt": 4,
+    b"\x1b\x1da": 4,
+    b"\x1b\x1dyS": 6,
+    b"\x1b\x1dyP": 4,
+    b"\x1b\x1dxS\x00": 8,
+    b"\x1b\x1dxS": 6,
+    b"\x1b\x1dxP": 4,
+    b"\x1b\x1cp": 5,
+}
+
+_NAMES = {
+    b"\x1b@": "initialize",
+    b"\x1b#*\n\x00": "asb_enable",
+    b"\x1b\x1eE": "reset_etb_counter",
+    b"\x1b\x1eF": "set_font",
+    b"\x1b\x1er": "set_print_speed",
+    b"\x1b\x1ed": "set_print_density",
+    b"\x1bi": "set_font_scale",
+    b"\x1bd": "cut",
+    b"\x1bJ": "feed",
+    b"\x1b\x1dc": "set_reduced_printing",
+    b"\x1b\x1dt": "set_code_page",
+    b"\x1b\x1da": "set_position_alignment",
+    b"\x1b\x1dyS": "qr_setting",
+    b"\x1b\x1dyP": "qr_print",
+    b"\x1b\x1dxS\x00": "pdf417_size",
+    b"\x1b\x1dxS": "pdf417_setting",
+    b"\x1b\x1dxP": "pdf417_print",
+    b"\x1b\x1cp": "print_logo",
+}
+
+# symbol data: prefix -> (header length, offset of the little endian data length)
+_SYMBOL_DATA = {
+    b"\x1b\x1dyD": (8, 6),
+    b"\x1b\x1dxD": (6, 4),
+}
+
+
+class _Session:
+    # one client connection: decodes commands, feeds them through a simulated print head
+
+    def __init__(self, emulator: "PrinterEmulator", reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.emulator = emulator
+        self.reader = reader
+        self.writer = writer
+        self.buffer = bytearray()
+        self.text = bytearray()
+        self.asb = False
+        self.etb_counter = 0
+        self.spooled = 0
+        self.full = False
+        self.resume = asyncio.Event()
+        self.resume.set()
+        # (dot rows to print, bytes freed, is ETB)
+        self.work: asyncio.Queue[tuple[int, int, bool]] = asyncio.Queue()
+
+    def status(self, version: str | None = None) -> bytes:
+        size = self.emulator.asb_size
+        frame = bytearray(size)
+        frame[0] = _seven_bit(size) | 1
+        frame[1] = _seven_bit(3) | (0x80 if version is not None else 0)
+        if size > 7:
+            frame[7] = _seven_bit(self.etb_counter)
+        if size > 10 and self.full:
+            frame[10] |= 1 << 2
+        if version is not None:
+            data = b"11" + bytes(8) + version.encode() + b"\x00\x00\n"
+            frame += pack("<H", len(data)) + data
+        return bytes(frame)
+
+    def send_status(self, version: str | None = None):
+        if self.asb and not self.writer.is_closing():
+            self.writer.write(self.status(version))
+
+    def record(self, *command):
+        if self.emulator.record:
+            self.emulator.commands.append(command)
+
+    def spool(self, rows: int, size: int, etb: bool = False):
+        self.spooled += size
+        self.work.put_nowait((rows, size, etb))
+
+    def decode(self) -> int:
+        buf = self.buffer
+        pos = 0
+        while pos < len(buf):
+            byte = buf[pos]
+            if byte == 0x1b:
+                length = self._escape(pos)
+                if length is None:
+                    break
+                pos += length
+                continue
+            if byte == 0x17:
+                self.record("etb")
+                self.spool(0, 1, True)
+            elif byte == 0x0a:
+                self.record("text", bytes(self.text))
+                self.spool(self.emulator.line_height, len(self.text) + 1)
+                self.text.clear()
+            elif byte in (0x07, 0x1a):
+                self.record("external_device", byte)
+                self.spool(0, 1)
+            else:
+                self.text.append(byte)
+            pos += 1
+        return pos
+
+    def _escape(self, pos: int) -> int | None:
+        # length of the escape sequence at pos, None if it isn't complete yet
+        buf = self.buffer
+        available = len(buf) - pos
+        if available < 2:
+            return None
+        for prefix, length in _FIXED.items():
+            if buf.startswith(prefix, pos) or available < len(prefix) and prefix.startswith(buf[pos:]):
+                if available < length:
+                    return None
+                args = bytes(buf[pos + len(prefix):pos + length])
+                name = _NAMES[prefix]
+                self.record(name, args)
+                if name == "asb_enable":
+                    self.asb = True
+                    self.send_status()
+                elif name == "reset_etb_counter":
+                    self.etb_counter = 0
+                # ESC J n feeds n/4 mm, 2 dot rows
+                rows = args[0] * 2 if name == "feed" else self.emulator.cut_rows if name == "cut" else 0
+                self.spool(rows, length)
+                return length
+        for prefix, (header, offset) in _SYMBOL_DATA.items():
+            if buf.startswith(prefix, pos):
+                if available < header:
+                    return None
+                length = header + unpack("<H", buf[pos + offset:pos + offset + 2])[0]
+                if available < length:
+                    return None
+                self.record("qr_data" if prefix[2] == ord("y") else "pdf417_data", bytes(buf[pos + header:pos + length]))
+                self.spool(0, length)
+                return length
+        if buf.startswith(b"\x1b\x1cq", pos):
+            # n blocks of xL xH yL yH followed by x * y * 8 bytes
+            end = pos + 4
+            if available < 4:
+                return None
+            sizes = []
+            for _ in range(buf[pos + 3]):
+                if len(buf) < end + 4:
+                    return None
+                x, y = unpack("<HH", buf[end:end + 4])
+                sizes.append((x * 8, y * 8))
+                end += 4 + x * y * 8
+            if len(buf) < end:
+                return None
+            self.record("define_logos", sizes)
+            self.spool(0, end - pos)
+            return end - pos
+        if buf.startswith(b"\x1bb", pos):
+            end = buf.find(b"\x1e", pos)
+            if end < 0:
+                return None
+            if end - pos < 6:
+                self.record("unknown", bytes(buf[pos:end + 1]))
+            else:
+                self.record("barcode", buf[pos + 2], bytes(buf[pos + 6:end]))
+            self.spool(buf[pos + 5] if end - pos >= 6 else 0, end + 1 - pos)
+            return end + 1 - pos
+        if buf.startswith(b"\x1b\x1dS", pos):
+            if available < 9:
+                return None
+            width, height = unpack("<HH", buf[pos + 4:pos + 8])
+            length = 9 + width * height
+            if available < length:
+                return None
+            self.record("raster", width * 8, height)
+            self.emulator.rasters += 1
+            self.spool(height, length)
+            return length
+        if buf.startswith(b"\x1b\x1d)", pos):
+            if available < 6:
+                return None
+            length = 6 + unpack("<H", buf[pos + 4:pos + 6])[0]
+            if available < length:
+                return None
+            function = chr(buf[pos + 3])
+            self.record("setting", function, bytes(buf[pos + 6:pos + length]))
+            if function == "I":
+                self.send_status(self.emulator.version)
+            self.spool(0, length)
+            return length
+        if available < 3 and b"\x1b\x1d".startswith(buf[pos:]):
+            return None
+        self.record("unknown", bytes(buf[pos:pos + 2]))
+        self.spool(0, 2)
+        return 2
+
+    async def run(self):
+        printer = asyncio.create_task(self.print_head())
+        try:
+            while True:
+                await self.resume.wait()
+                data = await self.reader.read(65536)
+                if not data:
+                    break
+                self.emulator.bytes_received += len(data)
+                self.buffer += data
+                del self.buffer[:self.decode()]
+                if self.spooled > self.emulator.spooler_size and not self.full:
+                    # stop reading until the head catches up, TCP backpressure does the rest
+                    self.full = True
+                    self.resume.clear()
+                    self.send_status()
+        finally:
+            printer.cancel()
+            self.writer.close()
+
+    async def print_head(self):
+        seconds_per_row = 1 / self.emulator.rows_per_second if self.emulator.rows_per_second else 0
+        while True:
+            rows, size, etb = await self.work.get()
+            if rows and seconds_per_row:
+                await asyncio.sleep(rows * seconds_per_row)
+            self.spooled -= size
+            if etb:
+                self.etb_counter = (self.etb_counter + 1) % 32
+                self.emulator.jobs_printed += 1
+                self.send_status()
+            if self.full and self.spooled <= self.emulator.spooler_size // 2:
+                self.full = False
+                self.resume.set()
+                self.send_status()
+
+
+class PrinterEmulator:
+    # stand-in for a StarPRNT printer on the network port, for development and benchmarks
+    # rows_per_second 2000 is roughly 250 mm/s at 8 dots/mm, 0 prints instantly
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9100, rows_per_second: float = 2000,
+                 spooler_size: int = 64 * 1024, version: str = "EMU Ver1.0", asb_size: int = 11,
+                 record: bool = True):
+        self.host = host
+        self.port = port
+        self.rows_per_second = rows_per_second
+        self.spooler_size = spooler_size
+        self.version = version
+        self.asb_size = asb_size
+        self.record = record
+        self.line_height = 24
+        self.cut_rows = 24
+        self.commands: list[tuple] = []
+        self.bytes_received = 0
+        self.rasters = 0
+        self.jobs_printed = 0
+        self.connections = 0
+        self._server: asyncio.Server | None = None
+        self._sessions: set[asyncio.Task] = set()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        task = asyncio.current_task()
+        self._sessions.add(task)
+        try:
+            await _Session(self, reader, writer).run()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._sessions.discard(task)
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            for task in list(self._sessions):
+                task.cancel()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "PrinterEmulator":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+async def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="StarPRNT printer emulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--rows-per-second", type=float, default=2000)
+    args = parser.parse_args()
+    async with PrinterEmulator(args.host, args.port, args.rows_per_second) as emulator:
+        print(f"listening on {emulator.host}:{emulator.port}")
+        await asyncio.Event().wait()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from functools import lru_cache
+from typing import Iterable
+
+from .enums import Model, CodePage
+
+# 2.3.1 ESC GS t n: code page -> n
+CODE_PAGES = {
+    CodePage.CP437: 1,
+    CodePage.CP858: 4,
+    CodePage.CP852: 5,
+    CodePage.CP860: 6,
+    CodePage.CP861: 7,
+    CodePage.CP863: 8,
+    CodePage.CP865: 9,
+    CodePage.CP866: 10,
+    CodePage.CP855: 11,
+    CodePage.CP857: 12,
+    CodePage.CP862: 13,
+    CodePage.CP864: 14,
+    CodePage.CP737: 15,
+    CodePage.CP869: 17,
+    CodePage.CP874: 21,
+    CodePage.CP1252: 32,
+    CodePage.CP1250: 33,
+    CodePage.CP1251: 34,
+}
+
+# models without UTF-8 support, these print in the selected code page (CP437 after reset)
+NO_UTF8 = (Model.mPOP, Model.SM_L200, Model.SM_L300, Model.SM_S_T)
+
+
+class TextEncoder:
+    # memoizes the encoding of recurring strings (item names, headers) per codec
+
+    def __init__(self, codec: str = "utf-8", cache_size: int = 4096):
+        self.codec = codec
+        self.encode = lru_cache(maxsize=cache_size)(self._encode)
+
+    def _encode(self, text: str) -> bytes:
+        # characters the code page can't represent print as "?"
+        return text.encode(self.codec, errors="replace")
+
+    def encode_lines(self, lines: Iterable[str]) -> bytes:
+        encode = self.encode
+        return b"".join([encode(line) + b"\n" for line in lines])
+
+
+@lru_cache(maxsize=None)
+def encoder_for(model: Model, code_page: CodePage | None = None) -> TextEncoder:
+    # shared by every connection to the same kind of printer so the caches stay warm
+    if code_page is None:
+        if model not in NO_UTF8:
+            return TextEncoder("utf-8")
+        code_page = CodePage.CP437
+    return TextEncoder(code_page.name.lower())
@@ -58,4 +58,53 @@ class ReducedV(Enum):
 class Font(Enum):
     A = auto()
     B = auto()
-    C = auto()
\ No newline at end of file
+    C = auto()
+
+class DitherAlgorithm(Enum):
+    Sierra3 = auto()
+    FloydSteinberg = auto()
+    Atkinson = auto()
+    Ordered = auto()
+    Threshold = auto()
+
+class CodePage(Enum):
+    CP437 = auto()
+    CP737 = auto()
+    CP852 = auto()
+    CP855 = auto()
+    CP857 = auto()
+    CP858 = auto()
+    CP860 = auto()
+    CP861 = auto()
+    CP862 = auto()
+    CP863 = auto()
+    CP864 = auto()
+    CP865 = auto()
+    CP866 = auto()
+    CP869 = auto()
+    CP874 = auto()
+    CP1250 = auto()
+    CP1251 = auto()
+    CP1252 = auto()
+
+class JobState(Enum):
+    Queued = auto()
+    Sent = auto()
+    Confirmed = auto()
+
+class Barcode(Enum):
+    UPC_E = auto()
+    UPC_A = auto()
+    EAN8 = auto()
+    EAN13 = auto()
+    Code39 = auto()
+    ITF = auto()
+    Code128 = auto()
+    Code93 = auto()
+    NW7 = auto()
+
+class QRErrorCorrection(Enum):
+    L = auto()
+    M = auto()
+    Q = auto()
+    H = auto()
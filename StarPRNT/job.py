@@ -0,0 +1,62 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from concurrent.futures import Executor
+
+from .conn import StarPRNT
+from .enums import Model
+
+
+class StarPRNTJob(StarPRNT):
+    # collects commands into one buffer instead of writing them out one by one,
+    # the finished job can be sent to any connection as a single write, as many times as needed
+
+    def __init__(self, model: Model = Model.Unknown, version: str = "0.0", executor: Executor | None = None):
+        super().__init__(None, model, executor)
+        self.version = version
+        self._buffer = bytearray()
+        self.commands = 0
+
+    @classmethod
+    def for_printer(cls, printer: StarPRNT) -> "StarPRNTJob":
+        job = cls(printer.model, printer.version, printer.executor)
+        job.code_page = printer.code_page
+        job.raster_cache = printer.raster_cache
+        job.metrics = printer.metrics
+        job.image_gamma = printer.image_gamma
+        job.image_contrast = printer.image_contrast
+        job.image_trim = printer.image_trim
+        job.logos = printer.logos
+        job.text_renderer = printer.text_renderer
+        return job
+
+    async def connect(self, address: str):
+        raise TypeError("jobs are not connected, use send() instead")
+
+    async def close(self):
+        pass
+
+    async def write_raw(self, data: bytes):
+        self._buffer += data
+        self.commands += 1
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def __bytes__(self) -> bytes:
+        return bytes(self._buffer)
+
+    def append(self, job: "StarPRNTJob"):
+        self._buffer += job._buffer
+        self.commands += job.commands
+
+    def clear(self):
+        del self._buffer[:]
+        self.commands = 0
+
+    async def send(self, printer: StarPRNT):
+        if not self._buffer:
+            return
+        printer.metrics.count("job.commands", self.commands)
+        await printer.write_raw(self._buffer)
@@ -0,0 +1,176 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable
+
+from .conn import StarPRNTConnection
+from .job import StarPRNTJob
+
+# an async function filling in a job, e.g. one that awaits job.print_image(...) and job.cut();
+# it runs against a StarPRNTJob made for the printer, so rendering never touches the connection
+JobBuilder = Callable[[StarPRNTJob], Awaitable[None]]
+
+
+class _Entry:
+    __slots__ = ("key", "build", "future", "task", "job")
+
+    def __init__(self, key: tuple[int, int], build: JobBuilder | StarPRNTJob | bytes, future: asyncio.Future):
+        # (-priority, submission order), smaller goes first
+        self.key = key
+        self.build = build
+        self.future = future
+        self.task: asyncio.Task | None = None
+        self.job: StarPRNTJob | bytes | None = None
+
+
+class JobQueue:
+    # per connection pipeline: up to lookahead jobs are rendered ahead (their images in the printer's
+    # executor) while finished ones stream out, so the printer has the next receipt as soon as it can take it.
+    # Higher priority goes first; within a priority jobs print in the order they were submitted
+
+    def __init__(self, printer: StarPRNTConnection, lookahead: int = 2, confirm: bool = False):
+        if lookahead < 1:
+            raise ValueError("lookahead must be at least 1")
+        self.printer = printer
+        self.lookahead = lookahead
+        # resolve futures once the printer reports the job printed (ETB) instead of once it's written
+        self.confirm = confirm
+        self._order = itertools.count()
+        self._pending: list[tuple[tuple[int, int], _Entry]] = []
+        self._rendering: set[_Entry] = set()
+        self._ready: list[tuple[tuple[int, int], _Entry]] = []
+        self._sending: _Entry | None = None
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self._task = asyncio.create_task(self._send_worker())
+
+    def _entries(self) -> list[_Entry]:
+        entries = [entry for _, entry in self._pending + self._ready] + list(self._rendering)
+        if self._sending is not None:
+            entries.append(self._sending)
+        return entries
+
+    def __len__(self) -> int:
+        # jobs not finished yet
+        return sum(not entry.future.done() for entry in self._entries())
+
+    def submit(self, job: JobBuilder | StarPRNTJob | bytes, priority: int = 0) -> asyncio.Future:
+        # cancelling the returned future drops the job unless it's already being written
+        if self._closed:
+            raise ConnectionError("queue closed")
+        future = asyncio.get_running_loop().create_future()
+        entry = _Entry((-priority, next(self._order)), job, future)
+        future.add_done_callback(lambda _: self._cancelled(entry))
+        heapq.heappush(self._pending, (entry.key, entry))
+        self._fill()
+        return future
+
+    def _cancelled(self, entry: _Entry):
+        if entry.future.cancelled() and entry.task is not None:
+            entry.task.cancel()
+
+    def _fill(self):
+        # start rendering the best pending jobs while there's room ahead of the writer
+        while self._pending and len(self._rendering) + len(self._ready) < self.lookahead:
+            _, entry = heapq.heappop(self._pending)
+            if entry.future.done():
+                continue
+            if isinstance(entry.build, (StarPRNTJob, bytes)):
+                entry.job = entry.build
+                heapq.heappush(self._ready, (entry.key, entry))
+                self._wakeup.set()
+                continue
+            self._rendering.add(entry)
+            entry.task = asyncio.create_task(self._render(entry))
+
+    async def _render(self, entry: _Entry):
+        start = time.perf_counter()
+        job = StarPRNTJob.for_printer(self.printer)
+        try:
+            await entry.build(job)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            if not entry.future.done():
+                entry.future.set_exception(e)
+        else:
+            self.printer.metrics.timing("queue.render", time.perf_counter() - start)
+            entry.job = job
+            heapq.heappush(self._ready, (entry.key, entry))
+        finally:
+            self._rendering.discard(entry)
+            self._fill()
+            self._wakeup.set()
+
+    def _next(self) -> _Entry | None:
+        # best rendered job, unless an earlier job of the same priority is still rendering
+        while self._ready:
+            key, entry = self._ready[0]
+            if entry.future.done():
+                heapq.heappop(self._ready)
+                continue
+            if any(other.key[0] == key[0] and other.key < key for other in self._rendering):
+                return None
+            heapq.heappop(self._ready)
+            return entry
+        return None
+
+    async def _send_worker(self):
+        try:
+            while True:
+                entry = self._next()
+                if entry is None:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                # a slot is free again, render the next one while this one goes out
+                self._fill()
+                self._sending = entry
+                try:
+                    if isinstance(entry.job, StarPRNTJob):
+                        await entry.job.send(self.printer)
+                    else:
+                        await self.printer.write_raw(entry.job)
+                    if self.confirm:
+                        await self.printer.wait_printed()
+                except Exception as e:
+                    self._sending = None
+                    if not entry.future.done():
+                        entry.future.set_exception(e)
+                    if isinstance(e, OSError):
+                        raise
+                    continue
+                # left set when cancelled mid send, so closing fails this job too
+                self._sending = None
+                if not entry.future.done():
+                    entry.future.set_result(None)
+        finally:
+            self._fail(ConnectionError("queue closed"))
+
+    def _fail(self, exc: Exception):
+        self._closed = True
+        entries = self._entries()
+        self._pending.clear()
+        self._ready.clear()
+        for entry in entries:
+            if entry.task is not None:
+                entry.task.cancel()
+            if not entry.future.done():
+                entry.future.set_exception(exc)
+
+    async def join(self):
+        # waits for everything submitted so far
+        while futures := [entry.future for entry in self._entries() if not entry.future.done()]:
+            await asyncio.wait(futures)
+
+    async def close(self):
+        # drops whatever hasn't been written yet
+        self._task.cancel()
+        await asyncio.wait([self._task])
+        if not self._task.cancelled():
+            self._task.exception()
@@ -0,0 +1,75 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import asyncio
+import json
+import os
+import pathlib
+from io import BytesIO
+
+from .cache import RasterCache
+from .conn import StarPRNTConnection
+from .enums import DitherAlgorithm
+
+
+class LogoRegistry:
+    # remembers which logos each printer (by transport address) holds in NV memory, in a JSON file, so they are only
+    # uploaded when the set changes or the printer reports different firmware.
+    # ESC FS q replaces every logo at once, so the whole set is always defined together
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = pathlib.Path(path)
+        self.uploads = 0
+        try:
+            self._printers: dict[str, dict] = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            self._printers = {}
+
+    def _save(self):
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self._printers, indent=2))
+        os.replace(tmp, self.path)
+
+    def loaded(self, printer: StarPRNTConnection) -> dict[str, int]:
+        # name -> logo number the registry believes is on the printer, empty after a firmware change
+        entry = self._printers.get(printer.transport.address)
+        if entry is None or entry["version"] != printer.version:
+            return {}
+        return {name: number for number, name in enumerate(entry["logos"], 1)}
+
+    async def ensure(self, printer: StarPRNTConnection, logos: dict[str, str | BytesIO],
+                     dithering: DitherAlgorithm = DitherAlgorithm.Sierra3, width: int = 576,
+                     gamma: float | None = None, contrast: float = 1.0, timeout: float | None = 60) -> dict[str, int]:
+        # makes the printer hold exactly these logos, numbered 1.. in order; afterwards
+        # printer.print_logo(name) prints one with a 4 byte command
+        if not 1 <= len(logos) <= 255:
+            raise ValueError("logo count out of range (1-255)")
+        def read_and_hash() -> tuple[dict[str, bytes], dict[str, str]]:
+            sources = {}
+            digests = {}
+            for name, image in logos.items():
+                sources[name] = image.getvalue() if isinstance(image, BytesIO) else pathlib.Path(image).read_bytes()
+                digests[name] = RasterCache.key(sources[name], dithering, width, gamma, contrast)
+            return sources, digests
+
+        # same as print_image, reading and hashing the files stays off the event loop
+        sources, digests = await asyncio.get_running_loop().run_in_executor(None, read_and_hash)
+        entry = self._printers.get(printer.transport.address)
+        if entry is None or entry["version"] != printer.version \
+                or list(entry["logos"].items()) != list(digests.items()):
+            await printer.define_logos([BytesIO(source) for source in sources.values()], dithering, width,
+                                       gamma, contrast)
+            # the printer is done storing once the ETB comes back, only then is the registry right
+            await printer.wait_printed(timeout)
+            self._printers[printer.transport.address] = {"version": printer.version, "logos": digests}
+            self._save()
+            self.uploads += 1
+            printer.metrics.count("logo.uploads")
+        printer.logos = self.loaded(printer)
+        return printer.logos
+
+    def forget(self, printer: StarPRNTConnection):
+        # after the printer's memory was cleared some other way
+        if self._printers.pop(printer.transport.address, None) is not None:
+            self._save()
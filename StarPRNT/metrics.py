@@ -0,0 +1,58 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from collections import Counter, defaultdict, deque
+from typing import Any
+
+# names reported by the library:
+#   timings: image.decode, image.resize, image.luma, image.dither, image.pack, image.text,
+#            conn.connect, conn.send (write + drain), conn.spooler_wait, queue.render
+#   counts:  conn.bytes, conn.writes, job.commands, image.cache_hits, image.bytes, image.bytes_saved,
+#            asb.frames, asb.change.<field>, pool.reconnects, logo.uploads
+#   events:  asb.extra (extended status payload)
+
+
+class Metrics:
+    # hooks are no-ops, subclass and override the ones you want to forward somewhere
+
+    def timing(self, name: str, seconds: float):
+        pass
+
+    def count(self, name: str, value: int = 1):
+        pass
+
+    def event(self, name: str, value: Any):
+        pass
+
+
+NULL_METRICS = Metrics()
+
+
+class RecordingMetrics(Metrics):
+    # keeps everything in memory, handy for benchmarks and debugging
+
+    def __init__(self, max_events: int = 1000):
+        self.timings: defaultdict[str, list[float]] = defaultdict(list)
+        self.counts: Counter[str] = Counter()
+        self.events: deque[tuple[str, Any]] = deque(maxlen=max_events)
+
+    def timing(self, name: str, seconds: float):
+        self.timings[name].append(seconds)
+
+    def count(self, name: str, value: int = 1):
+        self.counts[name] += value
+
+    def event(self, name: str, value: Any):
+        self.events.append((name, value))
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return {
+            name: {"count": len(values), "total": sum(values), "mean": sum(values) / len(values), "max": max(values)}
+            for name, values in self.timings.items()
+        }
+
+    def clear(self):
+        self.timings.clear()
+        self.counts.clear()
+        self.events.clear()
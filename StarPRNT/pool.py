@@ -0,0 +1,184 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import asyncio
+from ipaddress import IPv4Address
+from typing import Awaitable, Callable
+
+from .asb import ASB
+from .conn import StarPRNTConnection, StarPRNTEthernet
+from .enums import Model
+from .job import StarPRNTJob
+from .metrics import Metrics, NULL_METRICS
+
+
+# opens a connection given (address, model, metrics=...), the connect classmethods fit
+Connector = Callable[..., Awaitable[StarPRNTConnection]]
+
+
+def usable(status: ASB) -> bool:
+    # fields missing from a short frame don't block printing
+    return status.online is not False and not status.paper_end and not status.cover_open
+
+
+class _Printer:
+    __slots__ = ("id", "address", "model", "connect", "conn", "queue", "inflight", "ready", "reconnects", "task")
+
+    def __init__(self, printer_id: str, address: str, model: Model, connect: Connector):
+        self.id = printer_id
+        self.address = address
+        self.model = model
+        self.connect = connect
+        self.conn: StarPRNTConnection | None = None
+        self.queue: asyncio.Queue[tuple[StarPRNTJob | bytes, asyncio.Future]] = asyncio.Queue()
+        self.inflight: asyncio.Future | None = None
+        # set while connected and the last ASB allows printing
+        self.ready = asyncio.Event()
+        self.reconnects = 0
+        self.task: asyncio.Task | None = None
+
+    def on_status(self, status: ASB, changed: list[str]):
+        if usable(status):
+            self.ready.set()
+        else:
+            self.ready.clear()
+
+
+class PrinterPool:
+    # keeps a persistent connection to every printer and feeds each one from its own job queue
+
+    def __init__(self, reconnect_delay: float = 0.5, max_reconnect_delay: float = 30.0,
+                 metrics: Metrics = NULL_METRICS, stable_after: float = 10.0):
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        # a connection has to stay up this long before the backoff starts over from reconnect_delay
+        self.stable_after = stable_after
+        # handed to every connection the pool opens
+        self.metrics = metrics
+        self._printers: dict[str, _Printer] = {}
+        self._closed = False
+
+    def add(self, printer_id: str, address: str, model: Model = Model.Unknown,
+            connect: Connector = StarPRNTEthernet.connect):
+        # connect opens the printer at address, e.g. StarPRNTUSB.connect with a device file
+        if printer_id in self._printers:
+            raise ValueError("printer already in pool")
+        if connect == StarPRNTEthernet.connect:
+            try:
+                IPv4Address(address)
+            except ValueError:
+                raise ValueError("invalid IP address")
+        printer = _Printer(printer_id, address, model, connect)
+        self._printers[printer_id] = printer
+        if not self._closed:
+            printer.task = asyncio.create_task(self._supervise(printer))
+
+    async def remove(self, printer_id: str):
+        printer = self._printers.pop(printer_id)
+        await self._stop(printer)
+
+    async def close(self):
+        self._closed = True
+        await asyncio.gather(*(self._stop(printer) for printer in self._printers.values()))
+
+    def __getitem__(self, printer_id: str) -> StarPRNTConnection | None:
+        return self._printers[printer_id].conn
+
+    def is_ready(self, printer_id: str) -> bool:
+        return self._printers[printer_id].ready.is_set()
+
+    def queue_depth(self) -> dict[str, int]:
+        return {printer.id: printer.queue.qsize() + (printer.inflight is not None) for printer in self._printers.values()}
+
+    def submit(self, job: StarPRNTJob | bytes, printer_id: str | None = None) -> asyncio.Future:
+        # without a printer id the job goes to the least loaded printer that can print right now,
+        # the returned future resolves once the job has been written to the printer
+        if printer_id is not None:
+            printer = self._printers[printer_id]
+        else:
+            candidates = [printer for printer in self._printers.values() if printer.ready.is_set()]
+            if not candidates:
+                raise ConnectionError("no printer available")
+            printer = min(candidates, key=lambda p: p.queue.qsize() + (p.inflight is not None))
+        future = asyncio.get_running_loop().create_future()
+        printer.queue.put_nowait((job, future))
+        return future
+
+    async def _stop(self, printer: _Printer):
+        if printer.task is not None:
+            printer.task.cancel()
+            await asyncio.wait([printer.task])
+        while not printer.queue.empty():
+            _, future = printer.queue.get_nowait()
+            if not future.done():
+                future.set_exception(ConnectionError("printer removed from pool"))
+
+    async def _supervise(self, printer: _Printer):
+        loop = asyncio.get_running_loop()
+        delay = self.reconnect_delay
+        while True:
+            try:
+                conn = await printer.connect(printer.address, printer.model, metrics=self.metrics)
+            except OSError:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                printer.reconnects += 1
+                self.metrics.count("pool.reconnects")
+                continue
+            connected = loop.time()
+            printer.conn = conn
+            conn.status_listeners.append(printer.on_status)
+            printer.on_status(conn.status, [])
+            sender = asyncio.create_task(self._send(printer, conn))
+            closed = asyncio.create_task(conn.wait_closed())
+            try:
+                await asyncio.wait([sender, closed], return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                printer.ready.clear()
+                printer.conn = None
+                closed.cancel()
+                sender.cancel()
+                await asyncio.wait([sender])
+                if not sender.cancelled():
+                    sender.exception()
+                if printer.inflight is not None and not printer.inflight.done():
+                    printer.inflight.set_exception(ConnectionError("connection lost"))
+                printer.inflight = None
+                await conn.close()
+            printer.reconnects += 1
+            self.metrics.count("pool.reconnects")
+            # a printer that accepts the connection and drops it right away is backed off like one that refuses
+            if loop.time() - connected >= self.stable_after:
+                delay = self.reconnect_delay
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _send(self, printer: _Printer, conn: StarPRNTConnection):
+        while True:
+            job, future = await printer.queue.get()
+            if future.done():
+                # cancelled while queued
+                continue
+            printer.inflight = future
+            await printer.ready.wait()
+            if future.done():
+                # cancelled while the printer was unusable
+                printer.inflight = None
+                continue
+            try:
+                if isinstance(job, StarPRNTJob):
+                    await job.send(conn)
+                else:
+                    await conn.write_raw(job)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                printer.inflight = None
+                if isinstance(e, OSError):
+                    # connection is gone, let the supervisor reconnect
+                    raise
+                continue
+            if not future.done():
+                future.set_result(None)
+            printer.inflight = None
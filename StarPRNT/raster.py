@@ -0,0 +1,281 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import math
+from io import BytesIO
+from struct import pack as pack_struct
+from functools import lru_cache
+from time import perf_counter
+from typing import Iterator
+
+import numpy as np
+from PIL import Image
+
+from .dither import Ditherer, dither
+from .enums import ImageAlignment, DitherAlgorithm
+
+# everything in here runs in an executor, possibly in another process, so keep it to
+# plain module-level functions taking picklable arguments
+
+
+def raster_command(data: bytes, width_bytes: int, height: int) -> bytes:
+    # 2.3.12 ESC GS S: m = 1, tone = 0 (monochrome)
+    return b"\x1b\x1dS\x01" + pack_struct("<HH", width_bytes, height) + b"\x00" + data
+
+
+# blank runs at least this tall are fed past with ESC J instead of being sent as raster rows
+MIN_FEED_ROWS = 8
+
+
+def _feed(rows: int) -> bytes:
+    # ESC J n feeds n/4 mm, 2 dot rows at 8 dots/mm; an odd row left over goes out as a 1 byte raster
+    units, odd = divmod(rows, 2)
+    command = b""
+    while units:
+        n = min(units, 255)
+        command += b"\x1bJ" + bytes([n])
+        units -= n
+    if odd:
+        command += raster_command(b"\x00", 1, 1)
+    return command
+
+
+def _sub_raster(packed: np.ndarray) -> bytes:
+    # drops the blank bytes right of the rightmost dot, the printer doesn't need them to keep the left edge
+    columns = np.flatnonzero(packed.any(axis=0))
+    width_bytes = int(columns[-1]) + 1 if columns.size else 1
+    return raster_command(packed[:, :width_bytes].tobytes(), width_bytes, len(packed))
+
+
+def encode(dots: np.ndarray, trim: bool = True, sizes: dict[str, int] | None = None) -> bytes:
+    return encode_packed(np.packbits(dots, axis=1), trim, sizes)
+
+
+def encode_packed(packed: np.ndarray, trim: bool = True, sizes: dict[str, int] | None = None) -> bytes:
+    # rows of packed bits (uint8, MSB first) to raster commands
+    # ESC GS S has no compressed mode on StarPRNT, so the savings come from not sending white:
+    # blank row runs become paper feeds and every remaining block of rows is trimmed on the right
+    height, width_bytes = packed.shape
+    if sizes is not None:
+        sizes["raw"] = sizes.get("raw", 0) + 9 + packed.size
+    if not trim:
+        data = raster_command(packed.tobytes(), width_bytes, height)
+    else:
+        blank = ~packed.any(axis=1)
+        edges = np.flatnonzero(np.diff(blank.view(np.int8))) + 1
+        parts = []
+        top = None
+        for start, end in zip([0, *edges.tolist()], [*edges.tolist(), height]):
+            if blank[start] and end - start >= MIN_FEED_ROWS:
+                if top is not None:
+                    parts.append(_sub_raster(packed[top:start]))
+                    top = None
+                parts.append(_feed(end - start))
+            elif top is None:
+                top = start
+        if top is not None:
+            parts.append(_sub_raster(packed[top:]))
+        data = b"".join(parts)
+    if sizes is not None:
+        sizes["sent"] = sizes.get("sent", 0) + len(data)
+    return data
+
+
+class _Stopwatch:
+    # adds the time since the previous lap to a stage, no-op without a timings dict
+
+    __slots__ = ("timings", "last")
+
+    def __init__(self, timings: dict[str, float] | None):
+        self.timings = timings
+        self.last = perf_counter()
+
+    def lap(self, stage: str):
+        if self.timings is None:
+            return
+        now = perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + now - self.last
+        self.last = now
+
+
+# BT.709 luma weights
+_LUMA_MATRIX = (0.2126, 0.7152, 0.0722, 0)
+# colour images have always been brightened with (Y ** (1 / 2.2)) ** 1.5, grayscale ones are left alone
+COLOUR_GAMMA = 2.2 / 1.5
+
+
+@lru_cache(maxsize=32)
+def tone_curve(gamma: float = 1.0, contrast: float = 1.0) -> list[int] | None:
+    # 256 entry lookup table for Image.point, None when it would be the identity
+    if gamma <= 0:
+        raise ValueError("gamma must be positive")
+    if gamma == 1.0 and contrast == 1.0:
+        return None
+    table = []
+    for i in range(256):
+        value = (i / 255) ** (1 / gamma) * 255
+        value = (value - 128) * contrast + 128
+        table.append(min(255, max(0, round(value))))
+    return table
+
+
+def _draft(img: Image.Image, max_width: int):
+    # lets JPEG decode straight at a reduced scale, must run before the image is loaded
+    width, height = img.size
+    if width > max_width and img.format == "JPEG":
+        img.draft(img.mode, (max_width, height * max_width // width))
+
+
+def _unpalette(img: Image.Image) -> Image.Image:
+    if img.mode in ("P", "PA") and (img.mode == "PA" or "transparency" in img.info):
+        img = img.convert("RGBA")
+    return img
+
+
+def _fit(img: Image.Image, max_width: int) -> Image.Image:
+    # alpha is kept, compositing happens on the resized luma
+    width, height = img.size
+    img = _unpalette(img)
+    if width > max_width:
+        img = img.resize((max_width, height * max_width // width), Image.LANCZOS, reducing_gap=3.0)
+    return img
+
+
+def _fitted_size(img: Image.Image, max_width: int) -> tuple[int, int]:
+    width, height = img.size
+    if width > max_width:
+        return max_width, height * max_width // width
+    return width, height
+
+
+def _fit_rows(img: Image.Image, max_width: int, top: int, bottom: int) -> Image.Image:
+    # rows top..bottom of the image as _fit sizes it, resampled from just the source rows they cover
+    # plus the Lanczos support around them, so no full size copy is ever made
+    width, height = img.size
+    fitted_width, fitted_height = _fitted_size(img, max_width)
+    if fitted_width == width:
+        return _unpalette(img.crop((0, top, width, bottom)))
+    scale = height / fitted_height
+    y0, y1 = top * scale, bottom * scale
+    margin = math.ceil(3 * width / fitted_width) + 1
+    first, last = max(int(y0) - margin, 0), min(math.ceil(y1) + margin, height)
+    source = _unpalette(img.crop((0, first, width, last)))
+    return source.resize((fitted_width, bottom - top), Image.LANCZOS, box=(0, y0 - first, width, y1 - first))
+
+
+def _to_luma(img: Image.Image, gamma: float | None = None, contrast: float = 1.0) -> np.ndarray:
+    alpha = img.getchannel("A") if img.mode in ("RGBA", "LA") else None
+    if img.mode in ("RGB", "RGBA"):
+        luma = (img if img.mode == "RGB" else img.convert("RGB")).convert("L", _LUMA_MATRIX)
+        if gamma is None:
+            gamma = COLOUR_GAMMA
+    elif img.mode == "LA":
+        luma = img.getchannel("L")
+    elif img.mode != "L":
+        # convert to grayscale with Pillow directly
+        luma = img.convert("L")
+    else:
+        luma = img
+    if alpha is not None:
+        # composite onto white paper
+        luma = Image.composite(luma, Image.new("L", luma.size, 255), alpha)
+    if (table := tone_curve(gamma or 1.0, contrast)) is not None:
+        luma = luma.point(table)
+    return np.asarray(luma, dtype=np.uint8)
+
+
+def load_luma(image: str | BytesIO, max_width: int = 576, gamma: float | None = None,
+              contrast: float = 1.0) -> np.ndarray:
+    with Image.open(image) as img:
+        _draft(img, max_width)
+        return _to_luma(_fit(img, max_width), gamma, contrast)
+
+
+def align(dots: np.ndarray, alignment: ImageAlignment, line_width: int = 576) -> np.ndarray:
+    height, width = dots.shape
+    if alignment == ImageAlignment.Center:
+        left = (line_width - width) // 2
+    elif alignment == ImageAlignment.Right:
+        left = line_width - width
+    else:
+        left = 0
+    if left <= 0:
+        return dots
+    line = np.zeros((height, line_width), dtype=bool)
+    line[:, left:left + width] = dots
+    return line
+
+
+def rasterize(image: str | BytesIO, alignment: ImageAlignment = ImageAlignment.Center,
+              dithering: DitherAlgorithm = DitherAlgorithm.Sierra3, width: int = 576,
+              gamma: float | None = None, contrast: float = 1.0, timings: dict[str, float] | None = None,
+              trim: bool = True, sizes: dict[str, int] | None = None) -> bytes:
+    clock = _Stopwatch(timings)
+    with Image.open(image) as img:
+        _draft(img, width)
+        img.load()
+        clock.lap("decode")
+        img = _fit(img, width)
+        clock.lap("resize")
+        luma = _to_luma(img, gamma, contrast)
+        clock.lap("luma")
+    dots = align(dither(luma, dithering), alignment, width)
+    clock.lap("dither")
+    data = encode(dots, trim, sizes)
+    clock.lap("pack")
+    return data
+
+
+def rasterize_timed(image: str | BytesIO, alignment: ImageAlignment = ImageAlignment.Center,
+                    dithering: DitherAlgorithm = DitherAlgorithm.Sierra3, width: int = 576,
+                    gamma: float | None = None, contrast: float = 1.0,
+                    trim: bool = True) -> tuple[bytes, dict[str, float], dict[str, int]]:
+    # for executors in other processes, where dicts passed in wouldn't come back
+    timings = {}
+    sizes = {}
+    return rasterize(image, alignment, dithering, width, gamma, contrast, timings, trim, sizes), timings, sizes
+
+
+def rasterize_bands(image: str | BytesIO, alignment: ImageAlignment = ImageAlignment.Center,
+                    dithering: DitherAlgorithm = DitherAlgorithm.Sierra3, width: int = 576,
+                    band_height: int = 256, gamma: float | None = None, contrast: float = 1.0,
+                    timings: dict[str, float] | None = None, trim: bool = True,
+                    sizes: dict[str, int] | None = None) -> Iterator[bytes]:
+    # one band of rows at a time; only the current band is ever resized, converted, dithered and packed.
+    # The decoded image itself is still held whole, Pillow can't decode most formats row by row
+    if band_height <= 0:
+        raise ValueError("band height must be positive")
+    clock = _Stopwatch(timings)
+    with Image.open(image) as img:
+        _draft(img, width)
+        img.load()
+        clock.lap("decode")
+        fitted_width, fitted_height = _fitted_size(img, width)
+        ditherer = Ditherer(fitted_width, dithering)
+        for top in range(0, fitted_height, band_height):
+            band = _fit_rows(img, width, top, min(top + band_height, fitted_height))
+            clock.lap("resize")
+            band = _to_luma(band, gamma, contrast)
+            clock.lap("luma")
+            dots = align(ditherer.dither(band), alignment, width)
+            clock.lap("dither")
+            data = encode(dots, trim, sizes)
+            clock.lap("pack")
+            yield data
+            # time spent by the consumer isn't ours
+            clock.last = perf_counter()
+
+
+def nv_image(image: str | BytesIO, dithering: DitherAlgorithm = DitherAlgorithm.Sierra3, width: int = 576,
+             gamma: float | None = None, contrast: float = 1.0) -> bytes:
+    # one [xL xH yL yH d1...dk] block of ESC FS q: x and y count 8 dot units, the data runs
+    # column by column with 8 vertical dots per byte, MSB on top
+    dots = dither(load_luma(image, width, gamma, contrast), dithering)
+    height, width = dots.shape
+    x, y = (width + 7) // 8, (height + 7) // 8
+    if y > 288:
+        raise ValueError("image too tall for a logo (2304 dots max)")
+    padded = np.zeros((y * 8, x * 8), dtype=bool)
+    padded[:height, :width] = dots
+    return pack_struct("<HH", x, y) + np.packbits(padded.T, axis=1).tobytes()
@@ -0,0 +1,133 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import mmap
+import os
+from struct import Struct
+
+from .conn import StarPRNTConnection
+from .enums import JobState
+from .job import StarPRNTJob
+
+# record: magic, state, 3 pad bytes, job id, payload length, then the payload
+_HEADER = Struct("<4sB3xQQ")
+_MAGIC = b"SPJ1"
+_STATE_OFFSET = 4
+
+
+class _Record:
+    __slots__ = ("offset", "job_id", "state", "length")
+
+    def __init__(self, offset: int, job_id: int, state: JobState, length: int):
+        self.offset = offset
+        self.job_id = job_id
+        self.state = state
+        self.length = length
+
+
+class Spool:
+    # append-only file of job payloads with a state byte per job, updated in place;
+    # after a crash or reconnect, sending resumes at the first job the printer hasn't confirmed
+
+    def __init__(self, path: str | os.PathLike, sync: bool = True):
+        self.path = os.fspath(path)
+        self.sync = sync
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._records: dict[int, _Record] = {}
+        self._map: mmap.mmap | None = None
+        self._end = 0
+        self._load()
+
+    def _load(self):
+        size = os.fstat(self._fd).st_size
+        offset = 0
+        while offset + _HEADER.size <= size:
+            magic, state, job_id, length = _HEADER.unpack(os.pread(self._fd, _HEADER.size, offset))
+            if magic != _MAGIC or offset + _HEADER.size + length > size:
+                break
+            self._records[job_id] = _Record(offset, job_id, JobState(state), length)
+            offset += _HEADER.size + length
+        if offset < size:
+            # torn write at the end, the job was never acknowledged to the caller
+            os.ftruncate(self._fd, offset)
+        self._end = offset
+        self._next_id = max(self._records, default=0) + 1
+
+    def _flush(self):
+        if self.sync:
+            os.fsync(self._fd)
+
+    def append(self, job: bytes | StarPRNTJob) -> int:
+        payload = bytes(job) if isinstance(job, StarPRNTJob) else job
+        job_id = self._next_id
+        self._next_id += 1
+        os.pwrite(self._fd, _HEADER.pack(_MAGIC, JobState.Queued.value, job_id, len(payload)) + payload, self._end)
+        self._flush()
+        self._records[job_id] = _Record(self._end, job_id, JobState.Queued, len(payload))
+        self._end += _HEADER.size + len(payload)
+        return job_id
+
+    def mark(self, job_id: int, state: JobState):
+        record = self._records[job_id]
+        # a single byte write can't be torn
+        os.pwrite(self._fd, bytes([state.value]), record.offset + _STATE_OFFSET)
+        self._flush()
+        record.state = state
+
+    def state(self, job_id: int) -> JobState:
+        return self._records[job_id].state
+
+    def payload(self, job_id: int) -> memoryview:
+        # a view into the mapped file, nothing is read into memory until it is used
+        record = self._records[job_id]
+        end = record.offset + _HEADER.size + record.length
+        if self._map is None or len(self._map) < end:
+            # not closed: views handed out earlier keep the old map alive, it is unmapped with the last of them
+            self._map = mmap.mmap(self._fd, self._end, access=mmap.ACCESS_READ)
+        return memoryview(self._map)[record.offset + _HEADER.size:end]
+
+    def pending(self) -> list[int]:
+        return [job_id for job_id, record in self._records.items() if record.state != JobState.Confirmed]
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    async def send_pending(self, printer: StarPRNTConnection, timeout: float | None = None):
+        # jobs left in Sent were interrupted before the printer confirmed them and are sent again
+        for job_id in self.pending():
+            with self.payload(job_id) as payload:
+                await printer.write_raw(payload)
+            self.mark(job_id, JobState.Sent)
+            await printer.wait_printed(timeout)
+            self.mark(job_id, JobState.Confirmed)
+
+    def compact(self):
+        # drops confirmed jobs; payload views handed out earlier stay valid, they still map the old file
+        self._map = None
+        tmp = f"{self.path}.tmp"
+        fd = os.open(tmp, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        records = {}
+        offset = 0
+        try:
+            for record in self._records.values():
+                if record.state == JobState.Confirmed:
+                    continue
+                data = os.pread(self._fd, _HEADER.size + record.length, record.offset)
+                os.pwrite(fd, data, offset)
+                records[record.job_id] = _Record(offset, record.job_id, record.state, record.length)
+                offset += len(data)
+            os.fsync(fd)
+        except BaseException:
+            os.close(fd)
+            os.unlink(tmp)
+            raise
+        os.replace(tmp, self.path)
+        os.close(self._fd)
+        self._fd = fd
+        self._records = records
+        self._end = offset
+
+    def close(self):
+        self._map = None
+        os.close(self._fd)
@@ -0,0 +1,100 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import asyncio
+import weakref
+from fnmatch import fnmatchcase
+from typing import Any, Callable, NamedTuple
+
+from .asb import ASB, FIELDS
+
+# patterns matching every error flag, for subscribe(*ERRORS)
+ERRORS = ("*_error", "*_overheat")
+
+StatusListener = Callable[[ASB, list[str]], Any]
+
+
+class StatusEvent(NamedTuple):
+    status: ASB
+    # every field that changed since the previous event delivered to this subscriber
+    changed: list[str]
+
+
+def field_filter(patterns: tuple[str, ...]) -> frozenset[str] | None:
+    # glob patterns to the set of ASB field names they cover, None means all fields
+    if not patterns:
+        return None
+    fields = frozenset(name for name in FIELDS if any(fnmatchcase(name, pattern) for pattern in patterns))
+    if not fields:
+        raise ValueError("no status field matches")
+    return fields
+
+
+def _discard(listeners: list[StatusListener], listener: StatusListener):
+    if listener in listeners:
+        listeners.remove(listener)
+
+
+class StatusSubscription:
+    # async iterator over status changes; when the consumer falls behind, changes pile up
+    # into a single event carrying the latest status instead of queueing every frame
+
+    def __init__(self, listeners: list[StatusListener], *fields: str):
+        self._listeners = listeners
+        self._fields = field_filter(fields)
+        self._changed: dict[str, None] = {}
+        self._status: ASB | None = None
+        self._ready = asyncio.Event()
+        self._closed = False
+        # the listener only holds the subscription weakly: a consumer that breaks out of its
+        # async for drops the last reference, and the listener unregisters itself with it
+        method = weakref.WeakMethod(self._on_status, lambda _: _discard(listeners, listener))
+
+        def listener(status: ASB, changed: list[str]):
+            if (on_status := method()) is not None:
+                on_status(status, changed)
+
+        self._listener = listener
+        listeners.append(listener)
+
+    def _on_status(self, status: ASB, changed: list[str]):
+        if self._fields is not None:
+            changed = [name for name in changed if name in self._fields]
+            if not changed:
+                return
+        self._changed.update(dict.fromkeys(changed))
+        self._status = status
+        self._ready.set()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        _discard(self._listeners, self._listener)
+        self._ready.set()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def __aiter__(self) -> "StatusSubscription":
+        return self
+
+    async def __anext__(self) -> StatusEvent:
+        if not self._closed:
+            await self._ready.wait()
+        if not self._changed:
+            # closed with nothing left to deliver
+            raise StopAsyncIteration
+        if not self._closed:
+            self._ready.clear()
+        event = StatusEvent(self._status, list(self._changed))
+        self._changed.clear()
+        return event
+
+    async def __aenter__(self) -> "StatusSubscription":
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
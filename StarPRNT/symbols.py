@@ -0,0 +1,106 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from functools import lru_cache
+from struct import pack as pack_struct
+
+from .enums import Barcode, QRErrorCorrection, ImageAlignment
+
+# command bytes for bar codes and 2D codes; the builders are memoized since receipts
+# tend to repeat the same few codes (shop URL, loyalty card, order number prefix)
+
+# ESC b n1: symbology -> n1
+BARCODES = {
+    Barcode.UPC_E: 0,
+    Barcode.UPC_A: 1,
+    Barcode.EAN8: 2,
+    Barcode.EAN13: 3,
+    Barcode.Code39: 4,
+    Barcode.ITF: 5,
+    Barcode.Code128: 6,
+    Barcode.Code93: 7,
+    Barcode.NW7: 8,
+}
+
+# ESC GS y S 1 n: error correction level -> n
+QR_ERROR_CORRECTION = {
+    QRErrorCorrection.L: 0,
+    QRErrorCorrection.M: 1,
+    QRErrorCorrection.Q: 2,
+    QRErrorCorrection.H: 3,
+}
+
+# ESC GS a n
+_ALIGNMENT = {
+    ImageAlignment.Left: 0,
+    ImageAlignment.Center: 1,
+    ImageAlignment.Right: 2,
+}
+
+
+def _aligned(command: bytes, alignment: ImageAlignment) -> bytes:
+    # symbols follow the position alignment, put back to left afterwards so text isn't affected
+    if alignment == ImageAlignment.Left:
+        return command
+    return b"\x1b\x1da" + bytes([_ALIGNMENT[alignment]]) + command + b"\x1b\x1da\x00"
+
+
+@lru_cache(maxsize=256)
+def barcode_command(data: str, symbology: Barcode = Barcode.Code128, mode: int = 2, height: int = 80,
+                    hri: bool = True, alignment: ImageAlignment = ImageAlignment.Left) -> bytes:
+    # ESC b n1 n2 n3 n4 d1...dk RS; n2 2 prints the digits under the bars, 1 doesn't, both feed a line after
+    if not 1 <= mode <= 9:
+        raise ValueError("bar code mode out of range (1-9)")
+    if not 1 <= height <= 255:
+        raise ValueError("bar code height out of range (1-255)")
+    try:
+        payload = data.encode("ascii")
+    except UnicodeEncodeError:
+        raise ValueError("bar code data must be ASCII")
+    if not payload or b"\x1e" in payload:
+        raise ValueError("invalid bar code data")
+    command = b"\x1bb" + bytes([BARCODES[symbology], 2 if hri else 1, mode, height]) + payload + b"\x1e"
+    return _aligned(command, alignment)
+
+
+def _payload(data: str | bytes) -> bytes:
+    return data.encode("utf-8") if isinstance(data, str) else data
+
+
+@lru_cache(maxsize=256)
+def qr_command(data: str | bytes, correction: QRErrorCorrection = QRErrorCorrection.M, cell_size: int = 4,
+               alignment: ImageAlignment = ImageAlignment.Left) -> bytes:
+    # model 2, error correction, cell size, data with automatic mode selection, print
+    payload = _payload(data)
+    if not 1 <= len(payload) <= 7089:
+        raise ValueError("QR code data length out of range (1-7089)")
+    if not 1 <= cell_size <= 8:
+        raise ValueError("QR code cell size out of range (1-8)")
+    command = (b"\x1b\x1dyS\x00\x02"
+               + b"\x1b\x1dyS\x01" + bytes([QR_ERROR_CORRECTION[correction]])
+               + b"\x1b\x1dyS\x02" + bytes([cell_size])
+               + b"\x1b\x1dyD\x01\x00" + pack_struct("<H", len(payload)) + payload
+               + b"\x1b\x1dyP")
+    return _aligned(command, alignment)
+
+
+@lru_cache(maxsize=256)
+def pdf417_command(data: str | bytes, ecc: int = 1, module: int = 2, aspect: int = 3,
+                   alignment: ImageAlignment = ImageAlignment.Left) -> bytes:
+    # size from the aspect ratio, security level, module width, aspect ratio, data, print
+    payload = _payload(data)
+    if not 1 <= len(payload) <= 1024:
+        raise ValueError("PDF417 data length out of range (1-1024)")
+    if not 0 <= ecc <= 8:
+        raise ValueError("PDF417 security level out of range (0-8)")
+    if not 1 <= module <= 10 or not 1 <= aspect <= 10:
+        raise ValueError("PDF417 module / aspect ratio out of range (1-10)")
+    command = (b"\x1b\x1dxS\x00\x00\x00\x00"
+               + b"\x1b\x1dxS\x01" + bytes([ecc])
+               + b"\x1b\x1dxS\x02" + bytes([module])
+               + b"\x1b\x1dxS\x03" + bytes([aspect])
+               + b"\x1b\x1dxD" + pack_struct("<H", len(payload)) + payload
+               + b"\x1b\x1dxP")
+    return _aligned(command, alignment)
+
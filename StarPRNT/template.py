@@ -0,0 +1,62 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from concurrent.futures import Executor
+from typing import Callable
+
+from .conn import StarPRNT
+from .enums import Model
+from .job import StarPRNTJob
+
+
+class CompiledTemplate:
+    # static command bytes with named gaps, rendering is a single join
+
+    __slots__ = ("parts", "fields", "encoders")
+
+    def __init__(self, parts: list[bytes], fields: list[str], encoders: list[Callable[[str], bytes]]):
+        self.parts = parts
+        self.fields = fields
+        # per field, the encoding of the code page in effect where the field sits
+        self.encoders = encoders
+
+    def render(self, **values: str | bytes) -> bytes:
+        pieces = [self.parts[0]]
+        for name, encode, part in zip(self.fields, self.encoders, self.parts[1:]):
+            try:
+                value = values[name]
+            except KeyError:
+                raise ValueError(f"missing template field {name}")
+            pieces.append(encode(value) if isinstance(value, str) else bytes(value))
+            pieces.append(part)
+        return b"".join(pieces)
+
+    async def send(self, printer: StarPRNT, **values: str | bytes):
+        await printer.write_raw(self.render(**values))
+
+
+class ReceiptTemplate(StarPRNTJob):
+    # built like a job, with field() marking where per-receipt text goes;
+    # everything else, images included, is rendered once by compile()
+
+    def __init__(self, model: Model = Model.Unknown, version: str = "0.0", executor: Executor | None = None):
+        super().__init__(model, version, executor)
+        self._fields: list[tuple[int, str, Callable[[str], bytes]]] = []
+
+    async def field(self, name: str):
+        self._fields.append((len(self._buffer), name, self.encoder.encode))
+
+    def clear(self):
+        super().clear()
+        self._fields.clear()
+
+    def compile(self) -> CompiledTemplate:
+        parts = []
+        start = 0
+        for offset, _, _ in self._fields:
+            parts.append(bytes(self._buffer[start:offset]))
+            start = offset
+        parts.append(bytes(self._buffer[start:]))
+        return CompiledTemplate(parts, [name for _, name, _ in self._fields],
+                                [encode for _, _, encode in self._fields])
@@ -0,0 +1,122 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from functools import lru_cache
+from typing import Iterator
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from .enums import ImageAlignment
+from .raster import encode_packed
+
+# text drawn on the host in any TrueType font, straight to 1-bit rows: every glyph is rendered and
+# thresholded once, then kept packed at all 8 bit offsets so laying out a line is just ORing bytes
+
+
+@lru_cache(maxsize=16)
+def _font(font: str | None, size: int) -> ImageFont.FreeTypeFont:
+    # None is Pillow's bundled font
+    if font is None:
+        return ImageFont.load_default(size)
+    return ImageFont.truetype(font, size)
+
+
+class Glyph:
+    __slots__ = ("left", "top", "width", "height", "advance", "shifted")
+
+    def __init__(self, bits: np.ndarray, left: int, top: int, advance: float):
+        self.left = left
+        self.top = top
+        self.height, self.width = bits.shape
+        self.advance = advance
+        # shifted[k] is the glyph packed as if it started k bits into a byte
+        self.shifted = []
+        for shift in range(8):
+            padded = np.zeros((self.height, shift + self.width), dtype=bool)
+            padded[:, shift:] = bits
+            self.shifted.append(np.packbits(padded, axis=1))
+
+
+@lru_cache(maxsize=8192)
+def glyph(font: str | None, size: int, char: str, threshold: int = 128) -> Glyph:
+    face = _font(font, size)
+    left, top, right, bottom = face.getbbox(char)
+    img = Image.new("L", (max(right - left, 0), max(bottom - top, 0)))
+    if img.width and img.height:
+        ImageDraw.Draw(img).text((-left, -top), char, font=face, fill=255)
+    return Glyph(np.asarray(img) >= threshold, left, top, face.getlength(char))
+
+
+class TextRenderer:
+    # lays out and rasterizes text 576 dots wide, wrapping on spaces; rtl lays glyphs out right to left
+    # from the right edge, without shaping: scripts that need joining are beyond a per glyph cache
+
+    def __init__(self, font: str | None = None, size: int = 24, width: int = 576, line_spacing: int = 4,
+                 threshold: int = 128):
+        self.font = font
+        self.size = size
+        self.width = width
+        self.line_spacing = line_spacing
+        self.threshold = threshold
+        ascent, descent = _font(font, size).getmetrics()
+        self.line_height = ascent + descent
+
+    def _glyph(self, char: str) -> Glyph:
+        return glyph(self.font, self.size, char, self.threshold)
+
+    def measure(self, text: str) -> float:
+        return sum(self._glyph(char).advance for char in text)
+
+    def wrap(self, text: str) -> list[str]:
+        lines = []
+        for paragraph in text.split("\n"):
+            line = ""
+            for word in paragraph.split(" "):
+                candidate = f"{line} {word}" if line else word
+                if line and self.measure(candidate) > self.width:
+                    lines.append(line)
+                    line = word
+                else:
+                    line = candidate
+            lines.append(line)
+        return lines
+
+    def render_line(self, line: str, alignment: ImageAlignment = ImageAlignment.Left,
+                    rtl: bool = False) -> np.ndarray:
+        # one line of packed rows, line_height + line_spacing tall and width / 8 bytes wide
+        width_bytes = (self.width + 7) // 8
+        band = np.zeros((self.line_height + self.line_spacing, width_bytes), dtype=np.uint8)
+        glyphs = [self._glyph(char) for char in (reversed(line) if rtl else line)]
+        used = sum(g.advance for g in glyphs)
+        if alignment == ImageAlignment.Center:
+            pen = (self.width - used) / 2
+        elif alignment == ImageAlignment.Right or rtl and alignment == ImageAlignment.Left:
+            pen = self.width - used
+        else:
+            pen = 0
+        pen = max(pen, 0)
+        for g in glyphs:
+            x = round(pen) + g.left
+            pen += g.advance
+            if not g.width or x >= self.width:
+                continue
+            x = max(x, 0)
+            packed = g.shifted[x % 8]
+            start = x // 8
+            end = min(start + packed.shape[1], width_bytes)
+            top, bottom = max(g.top, 0), min(g.top + g.height, len(band))
+            if top < bottom:
+                band[top:bottom, start:end] |= packed[top - g.top:bottom - g.top, :end - start]
+        return band
+
+    def bands(self, text: str, alignment: ImageAlignment = ImageAlignment.Left,
+              rtl: bool = False) -> Iterator[np.ndarray]:
+        for line in self.wrap(text):
+            yield self.render_line(line, alignment, rtl)
+
+    def rasterize(self, text: str, alignment: ImageAlignment = ImageAlignment.Left, rtl: bool = False,
+                  trim: bool = True, sizes: dict[str, int] | None = None) -> bytes:
+        # the finished raster commands, same format print_image sends
+        return encode_packed(np.vstack(list(self.bands(text, alignment, rtl))), trim, sizes)
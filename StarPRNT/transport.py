@@ -0,0 +1,175 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import asyncio
+import os
+import socket
+from abc import ABC, abstractmethod
+
+
+class Transport(ABC):
+    # byte pipe to a printer; the connection on top does handshake, status and flow control.
+    # writes larger than chunk_size are split, with the spooler state rechecked in between
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, address: str):
+        # identifies the printer across reconnects, e.g. for the handshake probe cache
+        self.address = address
+
+    @abstractmethod
+    async def read(self) -> bytes:
+        # whatever the printer sent since the last call, b"" once the link is gone
+        pass
+
+    @abstractmethod
+    async def write(self, data: bytes):
+        # returns once the data is handed to the OS, not when it's printed
+        pass
+
+    @abstractmethod
+    def is_closing(self) -> bool:
+        pass
+
+    @abstractmethod
+    async def close(self):
+        pass
+
+
+class StreamTransport(Transport):
+    # anything asyncio streams can carry: TCP, RFCOMM
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, address: str,
+                 chunk_size: int | None = None):
+        super().__init__(address)
+        self._reader = reader
+        self._writer = writer
+        if chunk_size is not None:
+            self.chunk_size = chunk_size
+
+    async def read(self) -> bytes:
+        return await self._reader.read(524288)
+
+    async def write(self, data: bytes):
+        self._writer.write(data)
+        await self._writer.drain()
+
+    def is_closing(self) -> bool:
+        return self._writer.is_closing()
+
+    async def close(self):
+        if not self._writer.is_closing():
+            self._writer.close()
+            await self._writer.wait_closed()
+
+
+async def open_tcp(host: str, port: int = 9100, timeout: float = 5.0) -> StreamTransport:
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError("connection timed out")
+    except ConnectionRefusedError:
+        raise ConnectionRefusedError("connection refused")
+    return StreamTransport(reader, writer, f"{host}:{port}")
+
+
+async def open_rfcomm(address: str, channel: int = 1, timeout: float = 10.0) -> StreamTransport:
+    # Bluetooth SPP; the link manages a few tens of KB/s, small chunks keep status and ETBs flowing
+    if not hasattr(socket, "AF_BLUETOOTH"):
+        raise OSError("Bluetooth sockets are not available on this platform")
+    sock = socket.socket(socket.AF_BLUETOOTH, socket.SOCK_STREAM, socket.BTPROTO_RFCOMM)
+    sock.setblocking(False)
+    try:
+        await asyncio.wait_for(asyncio.get_running_loop().sock_connect(sock, (address, channel)), timeout=timeout)
+        reader, writer = await asyncio.open_connection(sock=sock)
+    except asyncio.TimeoutError:
+        sock.close()
+        raise TimeoutError("connection timed out")
+    except BaseException:
+        sock.close()
+        raise
+    return StreamTransport(reader, writer, f"bt:{address}:{channel}", chunk_size=1024)
+
+
+class DeviceTransport(Transport):
+    # a USB printer class device file (/dev/usb/lp0), non-blocking through the event loop's selector;
+    # chunks match the usblp driver's 8 KiB transfer buffer
+
+    chunk_size = 8192
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._loop = asyncio.get_running_loop()
+        self._fd = os.open(path, os.O_RDWR | os.O_NONBLOCK | os.O_NOCTTY)
+        self._closing = False
+
+    async def _ready(self, add, remove):
+        future = self._loop.create_future()
+        add(self._fd, lambda: future.done() or future.set_result(None))
+        try:
+            await future
+        finally:
+            remove(self._fd)
+
+    async def read(self) -> bytes:
+        while not self._closing:
+            try:
+                return os.read(self._fd, 4096)
+            except BlockingIOError:
+                await self._ready(self._loop.add_reader, self._loop.remove_reader)
+        return b""
+
+    async def write(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            if self._closing:
+                raise ConnectionError("connection closed")
+            try:
+                view = view[os.write(self._fd, view):]
+            except BlockingIOError:
+                await self._ready(self._loop.add_writer, self._loop.remove_writer)
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    async def close(self):
+        if not self._closing:
+            self._closing = True
+            self._loop.remove_reader(self._fd)
+            self._loop.remove_writer(self._fd)
+            os.close(self._fd)
+
+
+class LoopbackTransport(Transport):
+    # in memory, for tests: feed() plays the printer's side, written collects what was sent
+
+    def __init__(self, address: str = "loopback"):
+        super().__init__(address)
+        self.written = bytearray()
+        self._incoming: asyncio.Queue[bytes] = asyncio.Queue()
+        self._closing = False
+
+    def feed(self, data: bytes):
+        self._incoming.put_nowait(data)
+
+    def feed_eof(self):
+        self._incoming.put_nowait(b"")
+
+    async def read(self) -> bytes:
+        if self._closing:
+            return b""
+        return await self._incoming.get()
+
+    async def write(self, data: bytes):
+        if self._closing:
+            raise ConnectionError("connection closed")
+        self.written += data
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    async def close(self):
+        if not self._closing:
+            self._closing = True
+            self.feed_eof()
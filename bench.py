@@ -0,0 +1,135 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+# throughput / latency benchmarks against the local printer emulator, no printer needed:
+#   python bench.py [--quick]
+
+import argparse
+import asyncio
+import statistics
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from StarPRNT import StarPRNTEthernet, StarPRNTJob, DitherAlgorithm
+from StarPRNT.asb import ASBParser
+from StarPRNT.emulator import PrinterEmulator
+from StarPRNT.raster import rasterize, rasterize_timed
+
+
+def report(name: str, value: float, unit: str):
+    print(f"{name:<40} {value:>12.3f} {unit}")
+
+
+def sample_image(width: int = 576, height: int = 400) -> BytesIO:
+    # smooth gradients plus noise, roughly what a photo or colour logo costs
+    y, x = np.mgrid[0:height, 0:width]
+    rgb = np.stack([x * 255 / width, y * 255 / height, (x + y) * 127 / (width + height)], axis=-1)
+    rgb += np.random.default_rng(0).normal(0, 16, rgb.shape)
+    image = BytesIO()
+    Image.fromarray(rgb.clip(0, 255).astype(np.uint8), "RGB").save(image, "PNG")
+    return image
+
+
+def bench_rasterize(rounds: int):
+    image = sample_image()
+    for algorithm in DitherAlgorithm:
+        times = []
+        for _ in range(rounds):
+            image.seek(0)
+            start = time.process_time()
+            rasterize(image, dithering=algorithm)
+            times.append(time.process_time() - start)
+        report(f"print_image cpu ({algorithm.name})", statistics.median(times) * 1000, "ms/image")
+    image.seek(0)
+    _, timings, sizes = rasterize_timed(image)
+    for stage, seconds in timings.items():
+        report(f"  {stage} (Sierra3)", seconds * 1000, "ms")
+    report("  raster bytes sent / full bitmap", sizes["sent"] / sizes["raw"] * 100, "%")
+
+
+def bench_asb_parser(frames: int):
+    frame = bytes([0x23, 0x06, 0, 0, 0, 0, 0, 0, 0])
+    # odd sized reads so frames get split across feeds
+    stream = frame * frames
+    chunks = [stream[i:i + 1000] for i in range(0, len(stream), 1000)]
+    parser = ASBParser()
+    start = time.perf_counter()
+    count = 0
+    previous = None
+    for chunk in chunks:
+        for status, _ in parser.feed(chunk):
+            status.changes(previous)
+            previous = status
+            count += 1
+    report("asb parser", count / (time.perf_counter() - start), "frames/s")
+
+
+async def bench_connect(emulator: PrinterEmulator, rounds: int):
+    for name, cached in (("connection setup", False), ("connection setup (cached probe)", True)):
+        times = []
+        for _ in range(rounds):
+            if not cached:
+                StarPRNTEthernet.probes.clear()
+            start = time.perf_counter()
+            conn = await StarPRNTEthernet.connect(emulator.host, port=emulator.port)
+            times.append(time.perf_counter() - start)
+            await conn.close()
+        report(name, statistics.median(times) * 1000, "ms")
+
+
+async def bench_jobs(emulator: PrinterEmulator, jobs: int):
+    job = StarPRNTJob()
+    await job.initialize()
+    for i in range(30):
+        await job.print_line(f"Item {i:<20} {i * 1.25:>8.2f}")
+    await job.cut()
+    conn = await StarPRNTEthernet.connect(emulator.host, port=emulator.port)
+    received = emulator.bytes_received
+    start = time.perf_counter()
+    for _ in range(jobs):
+        await job.send(conn)
+        await conn.wait_printed(timeout=10)
+    elapsed = time.perf_counter() - start
+    report("receipt jobs", jobs / elapsed, "jobs/s")
+    report("receipt throughput", (emulator.bytes_received - received) / elapsed / 1024, "KiB/s")
+    await conn.close()
+
+
+async def bench_first_byte(emulator: PrinterEmulator, band_height: int | None):
+    image = sample_image(576, 2000)
+    conn = await StarPRNTEthernet.connect(emulator.host, port=emulator.port)
+    rasters = emulator.rasters
+    start = time.perf_counter()
+    task = asyncio.create_task(conn.print_image(image, band_height=band_height))
+    while emulator.rasters == rasters:
+        await asyncio.sleep(0.001)
+    first = time.perf_counter() - start
+    await task
+    await conn.wait_printed(timeout=30)
+    name = "whole image" if band_height is None else f"bands of {band_height}"
+    report(f"time to first raster ({name})", first * 1000, "ms")
+    await conn.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="PyStarPRNT benchmarks")
+    parser.add_argument("--quick", action="store_true", help="fewer rounds")
+    parser.add_argument("--port", type=int, default=9100, help="port for the emulator")
+    args = parser.parse_args()
+    rounds = 2 if args.quick else 10
+
+    bench_rasterize(rounds)
+    bench_asb_parser(20000 if args.quick else 200000)
+    async with PrinterEmulator(port=args.port, rows_per_second=0, record=False) as emulator:
+        await bench_connect(emulator, rounds)
+        await bench_jobs(emulator, 20 if args.quick else 200)
+        await bench_first_byte(emulator, None)
+        await bench_first_byte(emulator, 128)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
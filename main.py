@@ -13,39 +13,39 @@ async def main():
     await conn.initialize()
     await conn.print_line("Heat up")
     await conn.raster_test()
-    await asyncio.sleep(0.5)
+    await conn.wait_printed()
     await conn.set_print_density(PrintDensity.Minus3)
     await conn.print_line("-3")
     await conn.raster_test()
-    await asyncio.sleep(0.5)
+    await conn.wait_printed()
     await conn.set_print_density(PrintDensity.Minus2)
     await conn.print_line("-2")
     await conn.raster_test()
-    await asyncio.sleep(0.5)
+    await conn.wait_printed()
     await conn.set_print_density(PrintDensity.Minus1)
     await conn.print_line("-1")
     await conn.raster_test()
-    await asyncio.sleep(0.5)
+    await conn.wait_printed()
     await conn.set_print_density(PrintDensity.Standard)
     await conn.print_line("Standard")
     await conn.raster_test()
-    await asyncio.sleep(0.5)
+    await conn.wait_printed()
     await conn.set_print_density(PrintDensity.Plus1)
     await conn.print_line("+1")
     await conn.raster_test()
-    await asyncio.sleep(0.5)
+    await conn.wait_printed()
     await conn.set_print_density(PrintDensity.Plus2)
     await conn.print_line("+2")
     await conn.raster_test()
-    await asyncio.sleep(0.5)
+    await conn.wait_printed()
     await conn.set_print_density(PrintDensity.Plus3)
     await conn.print_line("+3")
     await conn.raster_test()
-    await asyncio.sleep(0.5)
+    await conn.wait_printed()
     await conn.set_print_density(PrintDensity.Plus4)
     await conn.print_line("+4")
     await conn.raster_test()
-    await asyncio.sleep(0.5)
+    await conn.wait_printed()
     await conn.cut()
     # await conn.raster_test()
     # await conn.initialize()
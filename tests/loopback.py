@@ -0,0 +1,47 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import asyncio
+import functools
+from struct import pack
+
+from StarPRNT.conn import StarPRNTConnection
+from StarPRNT.emulator import _seven_bit
+from StarPRNT.transport import LoopbackTransport
+
+
+def asb_frame(etb_counter: int = 0, cover_open: bool = False, spooler_full: bool = False,
+              version: str | None = None, size: int = 11) -> bytes:
+    # what a printer sends back, optionally with the version reply as extended status
+    frame = bytearray(size)
+    frame[0] = _seven_bit(size) | 1
+    frame[1] = _seven_bit(3) | (0x80 if version is not None else 0)
+    if cover_open:
+        frame[2] |= 1 << 5
+    frame[7] = _seven_bit(etb_counter)
+    if spooler_full:
+        frame[10] |= 1 << 2
+    if version is not None:
+        data = b"11" + bytes(8) + version.encode() + b"\x00\x00\n"
+        frame += pack("<H", len(data)) + data
+    return bytes(frame)
+
+
+async def open_loopback(address: str = "loopback", **kwargs) -> tuple[StarPRNTConnection, LoopbackTransport]:
+    # a connection past its handshake, with the handshake bytes already taken out of transport.written
+    transport = LoopbackTransport(address)
+    StarPRNTConnection.probes.pop(address, None)
+    transport.feed(asb_frame(version="TESTVer3.0"))
+    conn = await StarPRNTConnection.open(transport, timeout=1, **kwargs)
+    transport.written.clear()
+    return conn, transport
+
+
+def run(test):
+    # plain pytest, each async test gets its own event loop
+    @functools.wraps(test)
+    def wrapper(*args, **kwargs):
+        asyncio.run(test(*args, **kwargs))
+
+    return wrapper
@@ -0,0 +1,83 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import pytest
+
+from StarPRNT.asb import ASBParser
+
+from loopback import asb_frame
+
+
+def test_frame_split_across_reads():
+    parser = ASBParser()
+    frame = asb_frame(etb_counter=3, cover_open=True)
+    events = []
+    for byte in frame:
+        events += parser.feed(bytes([byte]))
+    assert len(events) == 1
+    assert events[0].status.cover_open
+    assert events[0].status.etb_counter == 3
+    assert events[0].extra is None
+
+
+def test_coalesced_frames_in_one_read():
+    parser = ASBParser()
+    events = parser.feed(asb_frame(etb_counter=1) + asb_frame(etb_counter=2) + asb_frame(etb_counter=3))
+    assert [event.status.etb_counter for event in events] == [1, 2, 3]
+
+
+def test_extended_frame_split_inside_the_extension():
+    parser = ASBParser()
+    data = asb_frame(version="TESTVer3.0") + asb_frame(etb_counter=5)
+    cut = 14
+    first = parser.feed(data[:cut])
+    assert first == []
+    events = parser.feed(data[cut:])
+    assert events[0].extra == {"printer_version": "TESTVer3.0"}
+    assert events[1].status.etb_counter == 5
+
+
+def test_partial_frame_is_kept_for_the_next_read():
+    parser = ASBParser()
+    data = asb_frame(etb_counter=1) + asb_frame(etb_counter=2)
+    events = parser.feed(data[:15])
+    assert [event.status.etb_counter for event in events] == [1]
+    events = parser.feed(data[15:])
+    assert [event.status.etb_counter for event in events] == [2]
+
+
+def test_garbage_before_a_frame_is_skipped():
+    parser = ASBParser()
+    events = parser.feed(b"\x00\xff\x80" + asb_frame(spooler_full=True))
+    assert len(events) == 1
+    assert events[0].status.spooler_buffer_full
+
+
+def test_changes_names_only_the_fields_that_differ():
+    before = ASBParser().feed(asb_frame())[0].status
+    after = ASBParser().feed(asb_frame(cover_open=True, etb_counter=4))[0].status
+    assert sorted(after.changes(before)) == ["cover_open", "etb_counter"]
+    assert after.changes(after) == []
+
+
+def test_first_frame_reports_every_field():
+    status = ASBParser().feed(asb_frame())[0].status
+    assert status.changes(None) == [name for name, _ in status.items()]
+
+
+def test_fields_beyond_the_frame_are_absent():
+    status = ASBParser().feed(asb_frame(size=9))[0].status
+    assert status.etb_counter == 0
+    assert status.spooler_buffer_full is None
+    assert "spooler_buffer_full" not in status
+    assert status.get("spooler_buffer_full", "missing") == "missing"
+    with pytest.raises(KeyError):
+        status["spooler_buffer_full"]
+
+
+def test_dict_style_access():
+    status = ASBParser().feed(asb_frame(cover_open=True))[0].status
+    assert status["cover_open"] is True
+    assert dict(status.items())["online"] is True
+    assert status == ASBParser().feed(asb_frame(cover_open=True))[0].status
@@ -0,0 +1,109 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import os
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from StarPRNT.cache import RasterCache
+from StarPRNT.enums import DitherAlgorithm
+from StarPRNT.metrics import RecordingMetrics
+
+from loopback import open_loopback, run
+
+
+def test_key_depends_on_content_and_parameters():
+    key = RasterCache.key(b"image", DitherAlgorithm.Sierra3, 576)
+    assert key == RasterCache.key(b"image", DitherAlgorithm.Sierra3, 576)
+    assert key != RasterCache.key(b"image", DitherAlgorithm.Atkinson, 576)
+    assert key != RasterCache.key(b"other", DitherAlgorithm.Sierra3, 576)
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = RasterCache(max_bytes=10)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"
+    cache.put("c", b"cccc")
+    assert "b" not in cache
+    assert cache.get("a") == b"aaaa" and cache.get("c") == b"cccc"
+    assert cache.size == 8
+    assert (cache.hits, cache.misses) == (3, 0)
+    assert cache.get("b") is None
+    assert cache.misses == 1
+
+
+def test_payload_larger_than_the_cache_is_not_kept_in_memory():
+    cache = RasterCache(max_bytes=4)
+    cache.put("small", b"ss")
+    cache.put("big", b"bbbbbbbb")
+    assert len(cache) == 1 and cache.get("small") == b"ss"
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    RasterCache(directory=tmp_path).put("key", b"payload")
+    cache = RasterCache(directory=tmp_path)
+    assert len(cache) == 0
+    assert cache.get("key") == b"payload"
+    assert len(cache) == 1
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_disk_tier_is_bounded_and_evicts_by_mtime(tmp_path):
+    cache = RasterCache(directory=tmp_path, max_disk_bytes=10)
+    cache.put("old", b"oooo")
+    cache.put("used", b"uuuu")
+    os.utime(tmp_path / "old.raster", (1, 1))
+    os.utime(tmp_path / "used.raster", (2, 2))
+    cache.clear()
+    # a disk hit makes the entry the most recently used one
+    assert cache.get("old") == b"oooo"
+    cache.put("new", b"nnnn")
+    assert sorted(path.stem for path in tmp_path.glob("*.raster")) == ["new", "old"]
+    assert cache.disk_size == 8
+
+
+def test_existing_directory_is_trimmed_on_open(tmp_path):
+    for index in range(4):
+        (tmp_path / f"{index}.raster").write_bytes(b"x" * 4)
+        os.utime(tmp_path / f"{index}.raster", (index, index))
+    cache = RasterCache(directory=tmp_path, max_disk_bytes=8)
+    assert sorted(path.stem for path in tmp_path.glob("*.raster")) == ["2", "3"]
+    assert cache.disk_size == 8
+
+
+def test_invalid_sizes():
+    with pytest.raises(ValueError):
+        RasterCache(max_bytes=0)
+    with pytest.raises(ValueError):
+        RasterCache(max_disk_bytes=0)
+
+
+@run
+async def test_fetch_and_save_go_through_the_disk_tier(tmp_path):
+    cache = RasterCache(directory=tmp_path)
+    await cache.save("key", b"payload")
+    assert (tmp_path / "key.raster").read_bytes() == b"payload"
+    cache.clear()
+    assert await cache.fetch("key") == b"payload"
+    assert await cache.fetch("missing") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+@run
+async def test_print_image_sends_cached_raster_on_repeat(tmp_path):
+    conn, transport = await open_loopback(metrics=RecordingMetrics())
+    conn.raster_cache = RasterCache(directory=tmp_path)
+    source = BytesIO()
+    Image.new("L", (64, 32), 100).save(source, "PNG")
+    await conn.print_image(BytesIO(source.getvalue()))
+    first = bytes(transport.written)
+    transport.written.clear()
+    await conn.print_image(BytesIO(source.getvalue()))
+    assert transport.written == first
+    assert conn.metrics.counts["image.cache_hits"] == 1
+    assert len(list(tmp_path.glob("*.raster"))) == 1
+    await conn.close()
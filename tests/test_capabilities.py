@@ -0,0 +1,62 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import pytest
+
+from StarPRNT.capabilities import capabilities_for, parse_version
+from StarPRNT.enums import Model, PrintDensity, PrintSpeed, UTF8Font
+from StarPRNT.job import StarPRNTJob
+
+from loopback import run
+
+
+def test_versions_compare_numerically():
+    assert parse_version("10.0") > parse_version("2.4")
+    assert parse_version("TESTVer3.0") == (3, 0)
+    assert parse_version("unknown") == (0,)
+
+
+@pytest.mark.parametrize("version, plus4", [("2.4", False), ("3.0", True), ("10.0", True)])
+def test_density_table_follows_firmware(version, plus4):
+    table = capabilities_for(Model.mC_Print3_G1, version).print_density
+    assert (PrintDensity.Plus4 in table) == plus4
+
+
+def test_tables_are_shared():
+    assert capabilities_for(Model.mPOP, "3.0") is capabilities_for(Model.mPOP, "Ver3.0")
+
+
+def test_external_device_2_needs_mpop_firmware_2():
+    assert not capabilities_for(Model.mPOP, "1.9").supports("external_device_2")
+    assert capabilities_for(Model.mPOP, "2.0").supports("external_device_2")
+    assert not capabilities_for(Model.SM_L200, "3.0").supports("external_device_1")
+
+
+@run
+async def test_commands_use_the_model_table():
+    job = StarPRNTJob(Model.SM_S_T, "3.0")
+    await job.set_print_speed(PrintSpeed.Fast)
+    assert bytes(job) == b"\x1b\x1er\x02"
+
+
+@run
+async def test_version_change_refreshes_the_table():
+    job = StarPRNTJob(Model.mC_Print3_G1, "2.4")
+    with pytest.raises(ValueError):
+        await job.set_print_density(PrintDensity.Plus4)
+    job.version = "3.0"
+    await job.set_print_density(PrintDensity.Plus4)
+    assert bytes(job) == b"\x1b\x1ed7"
+
+
+@run
+async def test_unsupported_commands_raise():
+    job = StarPRNTJob(Model.mPOP, "1.0")
+    with pytest.raises(ValueError):
+        await job.set_utf8_font(UTF8Font.Japanese)
+    with pytest.raises(ValueError):
+        await job.trigger_external_device_2()
+    with pytest.raises(ValueError):
+        await StarPRNTJob(Model.Unknown).set_print_speed(PrintSpeed.Fast)
+    assert len(job) == 0
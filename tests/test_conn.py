@@ -0,0 +1,226 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import asyncio
+
+import pytest
+
+from StarPRNT.conn import StarPRNTConnection
+from StarPRNT.metrics import RecordingMetrics
+from StarPRNT.transport import LoopbackTransport
+
+from loopback import asb_frame, open_loopback, run
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@run
+async def test_handshake_resets_the_etb_counter_before_enabling_asb():
+    transport = LoopbackTransport("handshake")
+    StarPRNTConnection.probes.pop("handshake", None)
+    transport.feed(asb_frame(version="TESTVer3.0"))
+    conn = await StarPRNTConnection.open(transport, timeout=1)
+    assert transport.written.index(b"\x1b\x1eE\x00") < transport.written.index(b"\x1b#*\n\x00")
+    assert conn.version == "3.0"
+    await conn.close()
+
+
+@run
+async def test_wait_printed_resolves_on_its_etb():
+    conn, transport = await open_loopback()
+    waiter = asyncio.create_task(conn.wait_printed(1))
+    await settle()
+    assert transport.written == b"\x17"
+    assert not waiter.done()
+    transport.feed(asb_frame(etb_counter=1))
+    await waiter
+    await conn.close()
+
+
+@run
+async def test_etb_counter_wraps():
+    conn, transport = await open_loopback()
+    for sequence in range(1, 40):
+        waiter = asyncio.create_task(conn.wait_printed(1))
+        await settle()
+        transport.feed(asb_frame(etb_counter=sequence % 32))
+        await waiter
+    assert conn._etb_done == conn._etb_sent == 39
+    await conn.close()
+
+
+@run
+async def test_several_etbs_confirmed_by_one_frame():
+    conn, transport = await open_loopback()
+    waiters = [asyncio.create_task(conn.wait_printed(1)) for _ in range(3)]
+    await settle()
+    transport.feed(asb_frame(etb_counter=2))
+    await settle()
+    assert [waiter.done() for waiter in waiters] == [True, True, False]
+    transport.feed(asb_frame(etb_counter=3))
+    await asyncio.gather(*waiters)
+    await conn.close()
+
+
+@run
+async def test_stale_counter_from_an_earlier_session_confirms_nothing():
+    transport = LoopbackTransport("stale")
+    StarPRNTConnection.probes.pop("stale", None)
+    # counter 5 reported before the reset took effect, then the reset itself
+    transport.feed(asb_frame(etb_counter=5, version="TESTVer3.0"))
+    transport.feed(asb_frame(etb_counter=0))
+    conn = await StarPRNTConnection.open(transport, timeout=1)
+    waiter = asyncio.create_task(conn.wait_printed(1))
+    await settle()
+    transport.feed(asb_frame(etb_counter=0, cover_open=True))
+    await settle()
+    assert not waiter.done()
+    transport.feed(asb_frame(etb_counter=1))
+    await waiter
+    await conn.close()
+
+
+@run
+async def test_wait_printed_fails_when_the_connection_drops():
+    conn, transport = await open_loopback()
+    waiter = asyncio.create_task(conn.wait_printed(1))
+    await settle()
+    transport.feed_eof()
+    with pytest.raises(ConnectionError):
+        await waiter
+    await conn.wait_closed()
+
+
+@run
+async def test_writes_wait_while_the_spooler_is_full():
+    conn, transport = await open_loopback()
+    transport.feed(asb_frame(spooler_full=True))
+    await settle()
+    writer = asyncio.create_task(conn.write_raw(b"data"))
+    await settle()
+    assert transport.written == b""
+    transport.feed(asb_frame())
+    await writer
+    assert transport.written == b"data"
+    await conn.close()
+
+
+@run
+async def test_wait_until_sees_a_frame_queued_before_the_call():
+    conn, transport = await open_loopback()
+    transport.feed(asb_frame(cover_open=True))
+    await settle()
+    transport.feed(asb_frame(cover_open=False))
+    status = await conn.wait_until(1, cover_open=False)
+    assert not status.cover_open
+    await conn.close()
+
+
+@run
+async def test_closed_subscription_delivers_pending_changes_then_ends():
+    conn, transport = await open_loopback()
+    subscription = conn.subscribe("cover_open")
+    transport.feed(asb_frame(cover_open=True))
+    await settle()
+    subscription.close()
+    events = [event async for event in subscription]
+    assert [event.changed for event in events] == [["cover_open"]]
+    assert [event async for event in subscription] == []
+    await conn.close()
+
+
+@run
+async def test_failing_status_callback_keeps_the_connection():
+    conn, transport = await open_loopback(metrics=RecordingMetrics())
+
+    def callback(status, changed):
+        raise RuntimeError("bug in the application")
+
+    conn.on_status(callback)
+    transport.feed(asb_frame(cover_open=True))
+    await settle()
+    assert not conn._read_task.done()
+    assert "asb.listener_error" in [name for name, _ in conn.metrics.events]
+    await conn.close()
+
+
+class _YieldingTransport(LoopbackTransport):
+    chunk_size = 4
+
+    async def write(self, data: bytes):
+        await asyncio.sleep(0)
+        await super().write(data)
+
+
+@run
+async def test_concurrent_chunked_writes_do_not_interleave():
+    transport = _YieldingTransport("chunks")
+    StarPRNTConnection.probes.pop("chunks", None)
+    transport.feed(asb_frame(version="TESTVer3.0"))
+    conn = await StarPRNTConnection.open(transport, timeout=1)
+    transport.written.clear()
+    await asyncio.gather(conn.write_raw(b"A" * 12), conn.write_raw(b"B" * 8))
+    assert transport.written == b"A" * 12 + b"B" * 8
+    await conn.close()
+
+
+@run
+async def test_manual_etbs_are_counted():
+    conn, transport = await open_loopback()
+    await conn.update_etb()
+    waiter = asyncio.create_task(conn.wait_printed(1))
+    await settle()
+    # the printer got through the manual ETB only
+    transport.feed(asb_frame(etb_counter=1))
+    await settle()
+    assert not waiter.done()
+    transport.feed(asb_frame(etb_counter=2))
+    await waiter
+    await conn.close()
+
+
+@run
+async def test_counter_reset_fails_outstanding_waiters_and_rebaselines():
+    conn, transport = await open_loopback()
+    for sequence in range(1, 4):
+        waiter = asyncio.create_task(conn.wait_printed(1))
+        await settle()
+        transport.feed(asb_frame(etb_counter=sequence))
+        await waiter
+    pending = asyncio.create_task(conn.wait_printed(1))
+    await settle()
+    await conn.reset_etb_counter()
+    with pytest.raises(RuntimeError):
+        await pending
+    # the printer still reports the pending ETB, then the reset
+    transport.feed(asb_frame(etb_counter=4))
+    await settle()
+    waiter = asyncio.create_task(conn.wait_printed(1))
+    await settle()
+    transport.feed(asb_frame(etb_counter=0))
+    await settle()
+    assert not waiter.done()
+    transport.feed(asb_frame(etb_counter=1))
+    await waiter
+    await conn.close()
+
+
+@run
+async def test_abandoned_subscription_unregisters():
+    conn, transport = await open_loopback()
+
+    async def first_change():
+        async for event in conn.subscribe("cover_open"):
+            return event
+
+    consumer = asyncio.create_task(first_change())
+    await settle()
+    assert len(conn.status_listeners) == 1
+    transport.feed(asb_frame(cover_open=True))
+    assert (await consumer).changed == ["cover_open"]
+    assert conn.status_listeners == []
+    await conn.close()
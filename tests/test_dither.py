@@ -0,0 +1,51 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+import pytest
+
+from StarPRNT.dither import Ditherer, dither
+from StarPRNT.enums import DitherAlgorithm
+
+# (dy, dx, weight / 32) of the original per pixel serpentine loop, for a left to right row
+_SIERRA3 = [(0, 1, 5), (0, 2, 3), (1, -2, 2), (1, -1, 4), (1, 0, 5), (1, 1, 4), (1, 2, 2), (2, -1, 2), (2, 0, 3),
+            (2, 1, 2)]
+
+
+def reference_sierra3(luma: np.ndarray) -> np.ndarray:
+    # the pixel loop print_image used before the NumPy engine, in the same order of float operations
+    height, width = luma.shape
+    data = [[float(value) for value in row] for row in luma]
+    dots = np.zeros((height, width), dtype=bool)
+    for y in range(height):
+        reverse = y % 2 == 1
+        for x in (range(width - 1, -1, -1) if reverse else range(width)):
+            old_pixel = data[y][x]
+            new_pixel = 0 if old_pixel < 128 else 255
+            error = old_pixel - new_pixel
+            dots[y, x] = new_pixel < 128
+            for dy, dx, weight in _SIERRA3:
+                tx = x - dx if reverse else x + dx
+                if y + dy < height and 0 <= tx < width:
+                    data[y + dy][tx] += error * weight / 32
+    return dots
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_sierra3_matches_pixel_loop(seed):
+    luma = np.random.default_rng(seed).integers(0, 256, (37, 61), dtype=np.uint8)
+    assert np.array_equal(dither(luma, DitherAlgorithm.Sierra3), reference_sierra3(luma))
+
+
+def test_sierra3_matches_pixel_loop_on_gradient():
+    luma = np.tile(np.linspace(0, 255, 96).astype(np.uint8), (24, 1))
+    assert np.array_equal(dither(luma, DitherAlgorithm.Sierra3), reference_sierra3(luma))
+
+
+@pytest.mark.parametrize("algorithm", list(DitherAlgorithm))
+def test_bands_join_like_one_pass(algorithm):
+    luma = np.random.default_rng(7).integers(0, 256, (45, 40), dtype=np.uint8)
+    ditherer = Ditherer(40, algorithm)
+    banded = np.vstack([ditherer.dither(luma[start:start + 8]) for start in range(0, 45, 8)])
+    assert np.array_equal(banded, dither(luma, algorithm))
@@ -0,0 +1,53 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import pytest
+
+from StarPRNT.encoding import NO_UTF8, TextEncoder, encoder_for
+from StarPRNT.enums import CodePage, Model
+from StarPRNT.job import StarPRNTJob
+
+from loopback import run
+
+
+def test_utf8_models_encode_utf8():
+    assert encoder_for(Model.mC_Print3_G2).encode("é") == "é".encode()
+
+
+@pytest.mark.parametrize("model", NO_UTF8)
+def test_models_without_utf8_default_to_cp437(model):
+    assert encoder_for(model).encode("é") == b"\x82"
+
+
+def test_selected_code_page_wins():
+    assert encoder_for(Model.mC_Print3_G2, CodePage.CP1252).encode("é") == b"\xe9"
+    assert encoder_for(Model.mPOP, CodePage.CP866).encode("Ж") == b"\x86"
+
+
+def test_unencodable_characters_print_as_question_marks():
+    assert encoder_for(Model.mPOP).encode("a€b") == b"a?b"
+
+
+def test_encoders_are_shared_and_memoized():
+    encoder = encoder_for(Model.SM_L200)
+    assert encoder is encoder_for(Model.SM_L200)
+    assert encoder is not encoder_for(Model.SM_L200, CodePage.CP858)
+    encoder.encode("Coffee")
+    hits = encoder.encode.cache_info().hits
+    encoder.encode("Coffee")
+    assert encoder.encode.cache_info().hits == hits + 1
+
+
+def test_encode_lines():
+    assert TextEncoder().encode_lines(["a", "é"]) == b"a\n" + "é".encode() + b"\n"
+
+
+@run
+async def test_print_follows_model_and_code_page():
+    job = StarPRNTJob(Model.mPOP)
+    await job.print("é")
+    await job.print_line("é")
+    await job.set_code_page(CodePage.CP1252)
+    await job.print_lines(["é", "e"])
+    assert bytes(job) == b"\x82\x82\n\x1b\x1dt" + bytes([32]) + b"\xe9\ne\n"
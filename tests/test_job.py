@@ -0,0 +1,65 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from StarPRNT.enums import Model
+from StarPRNT.job import StarPRNTJob
+from StarPRNT.metrics import RecordingMetrics
+
+from loopback import open_loopback, run
+
+
+async def receipt() -> StarPRNTJob:
+    job = StarPRNTJob()
+    await job.print_line("Total: 9.99")
+    await job.cut()
+    return job
+
+
+@run
+async def test_commands_are_buffered():
+    job = await receipt()
+    assert bytes(job) == b"Total: 9.99\n\x1bd2"
+    assert len(job) == len(b"Total: 9.99\n\x1bd2")
+    assert job.commands == 2
+
+
+@run
+async def test_send_is_one_write_and_can_repeat():
+    metrics = RecordingMetrics()
+    conn, transport = await open_loopback(metrics=metrics)
+    job = await receipt()
+    writes = metrics.counts["conn.writes"]
+    await job.send(conn)
+    await job.send(conn)
+    assert metrics.counts["conn.writes"] - writes == 2
+    assert metrics.counts["job.commands"] == 4
+    assert bytes(transport.written) == bytes(job) * 2
+    await conn.close()
+
+
+@run
+async def test_empty_job_sends_nothing():
+    conn, transport = await open_loopback()
+    await StarPRNTJob().send(conn)
+    assert transport.written == b""
+    await conn.close()
+
+
+@run
+async def test_append_and_clear():
+    job, other = await receipt(), await receipt()
+    job.append(other)
+    assert bytes(job) == bytes(other) * 2
+    assert job.commands == 4
+    job.clear()
+    assert len(job) == 0 and job.commands == 0
+
+
+@run
+async def test_for_printer_encodes_like_the_printer():
+    conn, _ = await open_loopback(model=Model.mPOP)
+    job = StarPRNTJob.for_printer(conn)
+    await job.print("é")
+    assert bytes(job) == b"\x82"
+    await conn.close()
@@ -0,0 +1,139 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import asyncio
+
+import pytest
+
+from StarPRNT.jobqueue import JobQueue
+
+from loopback import asb_frame, open_loopback, run
+
+
+def text_job(text: bytes, started: list[bytes] | None = None, gate: asyncio.Event | None = None):
+    async def build(job):
+        if started is not None:
+            started.append(text)
+        if gate is not None:
+            await gate.wait()
+        await job.write_raw(text)
+
+    return build
+
+
+@run
+async def test_higher_priority_goes_first():
+    conn, transport = await open_loopback()
+    queue = JobQueue(conn)
+    queue.submit(b"low,")
+    queue.submit(b"high,", priority=5)
+    queue.submit(b"mid,", priority=1)
+    await queue.join()
+    assert transport.written == b"high,mid,low,"
+    await queue.close()
+    await conn.close()
+
+
+@run
+async def test_submission_order_within_a_priority():
+    conn, transport = await open_loopback()
+    queue = JobQueue(conn, lookahead=3)
+    gate = asyncio.Event()
+    # the first job renders slowest but still prints first
+    queue.submit(text_job(b"1,", gate=gate))
+    queue.submit(text_job(b"2,"))
+    queue.submit(text_job(b"3,"))
+    await asyncio.sleep(0.01)
+    assert transport.written == b""
+    gate.set()
+    await queue.join()
+    assert transport.written == b"1,2,3,"
+    await queue.close()
+    await conn.close()
+
+
+@run
+async def test_lookahead_limits_rendering():
+    conn, transport = await open_loopback()
+    queue = JobQueue(conn, lookahead=2)
+    gate = asyncio.Event()
+    started = []
+    futures = [queue.submit(text_job(bytes([ord("a") + i]), started, gate)) for i in range(4)]
+    await asyncio.sleep(0.01)
+    assert started == [b"a", b"b"]
+    gate.set()
+    await asyncio.gather(*futures)
+    assert transport.written == b"abcd"
+    await queue.close()
+    await conn.close()
+
+
+@run
+async def test_cancelled_jobs_are_dropped():
+    conn, transport = await open_loopback()
+    queue = JobQueue(conn, lookahead=1)
+    gate = asyncio.Event()
+    started = []
+    rendering = queue.submit(text_job(b"rendering,", started, gate))
+    pending = queue.submit(text_job(b"pending,", started))
+    kept = queue.submit(b"kept,")
+    await asyncio.sleep(0.01)
+    assert started == [b"rendering,"]
+    rendering.cancel()
+    pending.cancel()
+    await kept
+    await queue.join()
+    assert transport.written == b"kept,"
+    assert started == [b"rendering,"]
+    assert len(queue) == 0
+    await queue.close()
+    await conn.close()
+
+
+@run
+async def test_failed_render_fails_only_its_job():
+    conn, transport = await open_loopback()
+    queue = JobQueue(conn)
+
+    async def broken(job):
+        raise ValueError("bad image")
+
+    failed = queue.submit(broken)
+    ok = queue.submit(b"ok")
+    with pytest.raises(ValueError):
+        await failed
+    await ok
+    assert transport.written == b"ok"
+    await queue.close()
+    await conn.close()
+
+
+@run
+async def test_confirm_waits_for_the_etb():
+    conn, transport = await open_loopback()
+    queue = JobQueue(conn, confirm=True)
+    future = queue.submit(b"receipt")
+    await asyncio.sleep(0.01)
+    assert transport.written == b"receipt\x17"
+    assert not future.done()
+    transport.feed(asb_frame(etb_counter=1))
+    await future
+    await queue.close()
+    await conn.close()
+
+
+@run
+async def test_close_fails_what_is_left():
+    conn, transport = await open_loopback()
+    queue = JobQueue(conn, confirm=True)
+    first = queue.submit(b"first")
+    second = queue.submit(b"second")
+    await asyncio.sleep(0.01)
+    await queue.close()
+    for future in (first, second):
+        with pytest.raises(ConnectionError):
+            await future
+    with pytest.raises(ConnectionError):
+        queue.submit(b"late")
+    await conn.close()
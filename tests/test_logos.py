@@ -0,0 +1,81 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import asyncio
+from io import BytesIO
+from struct import unpack
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from StarPRNT.logos import LogoRegistry
+from StarPRNT.raster import nv_image
+
+from loopback import asb_frame, open_loopback, run
+
+
+def png(width: int, height: int, fill: int = 0) -> BytesIO:
+    image = BytesIO()
+    Image.new("L", (width, height), fill).save(image, "PNG")
+    return image
+
+
+def test_nv_image_is_column_major_with_the_msb_on_top():
+    source = Image.new("L", (16, 8), 255)
+    source.putpixel((1, 0), 0)
+    source.putpixel((1, 7), 0)
+    image = BytesIO()
+    source.save(image, "PNG")
+    block = nv_image(image, width=16)
+    assert unpack("<HH", block[:4]) == (2, 1)
+    data = np.frombuffer(block[4:], np.uint8)
+    assert len(data) == 16
+    assert data[1] == 0b10000001
+    assert not data[np.arange(16) != 1].any()
+
+
+async def ensure_confirmed(registry: LogoRegistry, conn, transport, logos: dict, counter: int) -> dict[str, int]:
+    ensure = asyncio.create_task(registry.ensure(conn, logos, timeout=1))
+    while not transport.written.endswith(b"\x17"):
+        await asyncio.sleep(0.01)
+    transport.feed(asb_frame(etb_counter=counter))
+    return await ensure
+
+
+@run
+async def test_logos_are_uploaded_once_and_printed_by_name(tmp_path):
+    registry = LogoRegistry(tmp_path / "logos.json")
+    conn, transport = await open_loopback("logos")
+    logos = {"header": png(64, 16), "footer": png(32, 8)}
+    assert await ensure_confirmed(registry, conn, transport, logos, 1) == {"header": 1, "footer": 2}
+    assert transport.written.startswith(b"\x1b\x1cq\x02")
+    transport.written.clear()
+    # unchanged set, nothing goes to the printer, also from a fresh registry reading the file
+    registry = LogoRegistry(tmp_path / "logos.json")
+    assert await registry.ensure(conn, logos) == {"header": 1, "footer": 2}
+    assert transport.written == b""
+    await conn.print_logo("footer", double_height=True)
+    assert transport.written == b"\x1b\x1cp\x02\x02"
+    with pytest.raises(ValueError):
+        await conn.print_logo("missing")
+    await conn.close()
+
+
+@run
+async def test_changed_set_or_firmware_uploads_again(tmp_path):
+    registry = LogoRegistry(tmp_path / "logos.json")
+    conn, transport = await open_loopback("logos")
+    await ensure_confirmed(registry, conn, transport, {"header": png(64, 16)}, 1)
+    transport.written.clear()
+    await ensure_confirmed(registry, conn, transport, {"header": png(64, 16, 50)}, 2)
+    assert registry.uploads == 2
+    conn.version = "4.0"
+    assert registry.loaded(conn) == {}
+    transport.written.clear()
+    await ensure_confirmed(registry, conn, transport, {"header": png(64, 16, 50)}, 3)
+    assert registry.uploads == 3
+    registry.forget(conn)
+    assert registry.loaded(conn) == {}
+    await conn.close()
@@ -0,0 +1,126 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import asyncio
+
+import pytest
+
+from StarPRNT.conn import StarPRNTConnection
+from StarPRNT.pool import PrinterPool
+from StarPRNT.transport import LoopbackTransport
+
+from loopback import asb_frame, run
+
+
+class Printers:
+    # a Connector handing out loopback connections, keeps every transport it opened per address
+
+    def __init__(self, drop: bool = False):
+        self.transports: dict[str, list[LoopbackTransport]] = {}
+        self.drop = drop
+
+    async def connect(self, address: str, model, metrics) -> StarPRNTConnection:
+        transport = LoopbackTransport(address)
+        transport.feed(asb_frame(version="TESTVer3.0"))
+        conn = await StarPRNTConnection.open(transport, model, metrics=metrics, timeout=1)
+        transport.written.clear()
+        self.transports.setdefault(address, []).append(transport)
+        if self.drop:
+            transport.feed_eof()
+        return conn
+
+    def written(self, address: str) -> bytes:
+        return b"".join(bytes(transport.written) for transport in self.transports.get(address, []))
+
+
+async def ready(pool: PrinterPool, *printer_ids: str):
+    while not all(pool.is_ready(printer_id) for printer_id in printer_ids):
+        await asyncio.sleep(0.001)
+
+
+@run
+async def test_jobs_go_to_the_named_printer():
+    printers = Printers()
+    pool = PrinterPool()
+    pool.add("a", "a", connect=printers.connect)
+    pool.add("b", "b", connect=printers.connect)
+    await ready(pool, "a", "b")
+    await pool.submit(b"to b", "b")
+    assert printers.written("b") == b"to b"
+    assert printers.written("a") == b""
+    await pool.close()
+
+
+@run
+async def test_unnamed_jobs_go_to_a_ready_printer():
+    printers = Printers()
+    pool = PrinterPool()
+    pool.add("a", "a", connect=printers.connect)
+    pool.add("b", "b", connect=printers.connect)
+    await ready(pool, "a", "b")
+    printers.transports["a"][0].feed(asb_frame(cover_open=True))
+    while pool.is_ready("a"):
+        await asyncio.sleep(0.001)
+    await asyncio.gather(*(pool.submit(b"job") for _ in range(3)))
+    assert printers.written("b") == b"job" * 3
+    assert printers.written("a") == b""
+    await pool.close()
+
+
+@run
+async def test_no_ready_printer():
+    pool = PrinterPool()
+    with pytest.raises(ConnectionError):
+        pool.submit(b"job")
+    with pytest.raises(ValueError):
+        pool.add("bad", "not an address")
+    await pool.close()
+
+
+@run
+async def test_job_cancelled_while_the_printer_is_unusable_is_not_printed():
+    printers = Printers()
+    pool = PrinterPool()
+    pool.add("a", "a", connect=printers.connect)
+    await ready(pool, "a")
+    printers.transports["a"][0].feed(asb_frame(cover_open=True))
+    while pool.is_ready("a"):
+        await asyncio.sleep(0.001)
+    cancelled = pool.submit(b"cancelled", "a")
+    await asyncio.sleep(0.01)
+    cancelled.cancel()
+    kept = pool.submit(b"kept", "a")
+    printers.transports["a"][0].feed(asb_frame())
+    await kept
+    assert printers.written("a") == b"kept"
+    # the supervisor never saw an error, so there was no reconnect
+    assert len(printers.transports["a"]) == 1
+    await pool.close()
+
+
+@run
+async def test_dropped_connections_are_backed_off():
+    printers = Printers(drop=True)
+    pool = PrinterPool(reconnect_delay=0.01, max_reconnect_delay=1, stable_after=10)
+    pool.add("a", "a", connect=printers.connect)
+    await asyncio.sleep(0.2)
+    # 0.01, 0.02, 0.04, 0.08 s apart instead of a tight loop
+    assert 2 <= len(printers.transports["a"]) <= 6
+    await pool.close()
+
+
+@run
+async def test_removed_printer_fails_its_queue():
+    printers = Printers()
+    pool = PrinterPool()
+    pool.add("a", "a", connect=printers.connect)
+    await ready(pool, "a")
+    printers.transports["a"][0].feed(asb_frame(cover_open=True))
+    while pool.is_ready("a"):
+        await asyncio.sleep(0.001)
+    queued = pool.submit(b"job", "a")
+    await pool.remove("a")
+    with pytest.raises(ConnectionError):
+        await queued
+    await pool.close()
@@ -0,0 +1,108 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from io import BytesIO
+from struct import unpack
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from StarPRNT.enums import DitherAlgorithm
+from StarPRNT.raster import MIN_FEED_ROWS, _fit_rows, encode, rasterize, rasterize_bands
+
+
+def decode(data: bytes, width: int) -> np.ndarray:
+    # what the printer puts on paper for ESC GS S rasters and ESC J feeds, as a bool array
+    rows = []
+    pos = 0
+    while pos < len(data):
+        if data.startswith(b"\x1b\x1dS\x01", pos):
+            width_bytes, height = unpack("<HH", data[pos + 4:pos + 8])
+            assert data[pos + 8] == 0
+            packed = np.frombuffer(data, np.uint8, width_bytes * height, pos + 9).reshape(height, width_bytes)
+            dots = np.unpackbits(packed, axis=1)
+            padded = np.zeros((height, max(width, dots.shape[1])), dtype=bool)
+            padded[:, :dots.shape[1]] = dots
+            rows.append(padded[:, :width])
+            pos += 9 + width_bytes * height
+        elif data.startswith(b"\x1bJ", pos):
+            rows.append(np.zeros((data[pos + 2] * 2, width), dtype=bool))
+            pos += 3
+        else:
+            raise AssertionError(f"unexpected command at {pos}: {data[pos:pos + 4]!r}")
+    return np.vstack(rows) if rows else np.zeros((0, width), dtype=bool)
+
+
+def bitmap(height: int = 600, width: int = 96) -> np.ndarray:
+    dots = np.zeros((height, width), dtype=bool)
+    dots[0:3, 10:20] = True
+    # blank runs shorter than, at and above the feed minimum, an odd one and one beyond a single ESC J
+    dots[3 + MIN_FEED_ROWS - 1, 5] = True
+    dots[20 + MIN_FEED_ROWS, 0] = True
+    dots[60, 95] = True
+    dots[60 + 513, 40:48] = True
+    return dots
+
+
+@pytest.mark.parametrize("trim", [True, False])
+def test_round_trip(trim):
+    dots = bitmap()
+    assert np.array_equal(decode(encode(dots, trim), 96), dots)
+
+
+def test_trim_is_smaller_and_reports_sizes():
+    dots = bitmap()
+    sizes = {}
+    data = encode(dots, True, sizes)
+    assert sizes["sent"] == len(data)
+    assert sizes["raw"] == len(encode(dots, False))
+    assert len(data) < sizes["raw"]
+
+
+def test_trailing_and_leading_blank_rows():
+    dots = np.zeros((41, 64), dtype=bool)
+    dots[20, 3] = True
+    assert np.array_equal(decode(encode(dots), 64), dots)
+
+
+def test_all_blank():
+    dots = np.zeros((33, 576), dtype=bool)
+    data = encode(dots)
+    assert b"\x1b\x1dS" in data
+    assert np.array_equal(decode(data, 576), dots)
+
+
+def test_right_trim_keeps_the_left_edge():
+    dots = np.zeros((4, 576), dtype=bool)
+    dots[:, 17] = True
+    data = encode(dots)
+    assert unpack("<H", data[4:6])[0] == 3
+    assert np.array_equal(decode(data, 576), dots)
+
+
+def test_banded_resize_matches_resizing_the_whole_image():
+    rng = np.random.default_rng(3)
+    img = Image.fromarray(rng.integers(0, 256, (457, 1000), dtype=np.uint8))
+    whole = np.asarray(img.resize((576, 457 * 576 // 1000), Image.LANCZOS), dtype=np.int16)
+    bands = np.vstack([np.asarray(_fit_rows(img, 576, top, min(top + 64, 263)), dtype=np.int16)
+                       for top in range(0, 263, 64)])
+    assert bands.shape == whole.shape
+    assert np.abs(bands - whole).max() <= 1
+
+
+def test_palette_bands_with_transparency_are_converted():
+    img = Image.new("P", (20, 10))
+    img.info["transparency"] = 0
+    assert _fit_rows(img, 576, 0, 5).mode == "RGBA"
+
+
+@pytest.mark.parametrize("dithering", [DitherAlgorithm.Sierra3, DitherAlgorithm.Ordered])
+def test_bands_print_the_same_as_the_whole_image(dithering):
+    rng = np.random.default_rng(5)
+    source = BytesIO()
+    Image.fromarray(rng.integers(0, 256, (300, 200), dtype=np.uint8)).save(source, "PNG")
+    whole = decode(rasterize(BytesIO(source.getvalue()), dithering=dithering), 576)
+    banded = decode(b"".join(rasterize_bands(BytesIO(source.getvalue()), dithering=dithering, band_height=64)), 576)
+    assert np.array_equal(banded, whole)
@@ -0,0 +1,82 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import asyncio
+import os
+
+from StarPRNT.enums import JobState
+from StarPRNT.spool import Spool
+
+from loopback import asb_frame, open_loopback, run
+
+
+def test_jobs_survive_reopening(tmp_path):
+    spool = Spool(tmp_path / "spool", sync=False)
+    first = spool.append(b"first")
+    second = spool.append(b"second")
+    spool.mark(first, JobState.Confirmed)
+    spool.close()
+    spool = Spool(tmp_path / "spool", sync=False)
+    assert spool.state(first) == JobState.Confirmed
+    assert spool.pending() == [second]
+    assert bytes(spool.payload(second)) == b"second"
+    assert spool.append(b"third") == second + 1
+    spool.close()
+
+
+def test_torn_write_at_the_end_is_dropped(tmp_path):
+    spool = Spool(tmp_path / "spool", sync=False)
+    job = spool.append(b"complete")
+    spool.close()
+    with open(tmp_path / "spool", "ab") as file:
+        file.write(b"SPJ1\x00\x00\x00\x00partial")
+    size = os.path.getsize(tmp_path / "spool")
+    spool = Spool(tmp_path / "spool", sync=False)
+    assert spool.pending() == [job]
+    assert os.path.getsize(tmp_path / "spool") < size
+    spool.close()
+
+
+def test_payload_views_outlive_a_grown_file(tmp_path):
+    spool = Spool(tmp_path / "spool", sync=False)
+    first = spool.payload(spool.append(b"a" * 100))
+    second = spool.payload(spool.append(b"b" * 100))
+    assert bytes(first) == b"a" * 100
+    assert bytes(second) == b"b" * 100
+    spool.close()
+
+
+def test_compact_keeps_unconfirmed_jobs_and_live_views(tmp_path):
+    spool = Spool(tmp_path / "spool", sync=False)
+    done = spool.append(b"done")
+    kept = spool.append(b"kept")
+    view = spool.payload(kept)
+    spool.mark(done, JobState.Confirmed)
+    spool.compact()
+    assert bytes(view) == b"kept"
+    assert len(spool) == 1
+    assert bytes(spool.payload(kept)) == b"kept"
+    spool.close()
+    assert Spool(tmp_path / "spool", sync=False).pending() == [kept]
+
+
+@run
+async def test_send_pending_resumes_and_waits_for_each_etb(tmp_path):
+    spool = Spool(tmp_path / "spool", sync=False)
+    confirmed = spool.append(b"old")
+    spool.mark(confirmed, JobState.Confirmed)
+    interrupted = spool.append(b"one")
+    spool.mark(interrupted, JobState.Sent)
+    queued = spool.append(b"two")
+    conn, transport = await open_loopback()
+    sender = asyncio.create_task(spool.send_pending(conn, 1))
+    for counter in (1, 2):
+        await asyncio.sleep(0.01)
+        assert spool.state(interrupted if counter == 1 else queued) == JobState.Sent
+        transport.feed(asb_frame(etb_counter=counter))
+    await sender
+    assert transport.written == b"one\x17two\x17"
+    assert spool.pending() == []
+    spool.close()
+    await conn.close()
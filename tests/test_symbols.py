@@ -0,0 +1,61 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from struct import pack
+
+import pytest
+
+from StarPRNT.enums import Barcode, ImageAlignment, Model, QRErrorCorrection
+from StarPRNT.symbols import barcode_command, pdf417_command, qr_command
+
+from loopback import open_loopback, run
+
+
+def test_barcode_command():
+    assert barcode_command("12345", Barcode.Code39, 2, 60, hri=False) == b"\x1bb\x04\x01\x02\x3c12345\x1e"
+
+
+def test_barcode_rejects_bad_data():
+    with pytest.raises(ValueError):
+        barcode_command("café")
+    with pytest.raises(ValueError):
+        barcode_command("")
+    with pytest.raises(ValueError):
+        barcode_command("1", height=0)
+
+
+def test_qr_command():
+    command = qr_command("https://example.com", QRErrorCorrection.H, 6)
+    assert command.startswith(b"\x1b\x1dyS\x00\x02\x1b\x1dyS\x01\x03\x1b\x1dyS\x02\x06")
+    assert b"\x1b\x1dyD\x01\x00" + pack("<H", 19) + b"https://example.com" in command
+    assert command.endswith(b"\x1b\x1dyP")
+
+
+def test_qr_utf8_payload_length_is_in_bytes():
+    assert pack("<H", 2) + "é".encode() in qr_command("é")
+
+
+def test_pdf417_command():
+    command = pdf417_command(b"\x00data", ecc=3, module=4, aspect=5)
+    assert b"\x1b\x1dxS\x01\x03\x1b\x1dxS\x02\x04\x1b\x1dxS\x03\x05" in command
+    assert b"\x1b\x1dxD" + pack("<H", 5) + b"\x00data\x1b\x1dxP" in command
+    with pytest.raises(ValueError):
+        pdf417_command("x", ecc=9)
+
+
+def test_alignment_is_restored_to_left():
+    command = qr_command("x", alignment=ImageAlignment.Center)
+    assert command.startswith(b"\x1b\x1da\x01") and command.endswith(b"\x1b\x1da\x00")
+    assert not qr_command("x").startswith(b"\x1b\x1da")
+
+
+@run
+async def test_default_connection_prints_native_symbols():
+    conn, transport = await open_loopback()
+    assert conn.model == Model.Unknown
+    await conn.print_barcode("42")
+    await conn.print_qr_code("42")
+    await conn.print_pdf417("42")
+    assert transport.written == barcode_command("42") + qr_command("42") + pdf417_command("42")
+    await conn.close()
@@ -0,0 +1,54 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import pytest
+
+from StarPRNT.enums import CodePage, Model
+from StarPRNT.template import ReceiptTemplate
+
+from loopback import open_loopback, run
+
+
+async def receipt(model: Model = Model.Unknown) -> ReceiptTemplate:
+    template = ReceiptTemplate(model)
+    await template.print("Total: ")
+    await template.field("total")
+    await template.print_line("")
+    await template.cut()
+    return template
+
+
+@run
+async def test_render_fills_fields_between_static_parts():
+    template = await receipt()
+    compiled = template.compile()
+    assert compiled.fields == ["total"]
+    assert compiled.render(total="9.99") == b"Total: 9.99\n\x1bd2"
+    assert compiled.render(total=b"\x01") == b"Total: \x01\n\x1bd2"
+
+
+@run
+async def test_missing_field():
+    compiled = (await receipt()).compile()
+    with pytest.raises(ValueError):
+        compiled.render()
+
+
+@run
+async def test_fields_use_the_code_page_in_effect_where_they_sit():
+    template = ReceiptTemplate(Model.mPOP)
+    await template.field("before")
+    await template.set_code_page(CodePage.CP1252)
+    await template.field("after")
+    compiled = template.compile()
+    assert compiled.render(before="é", after="é") == b"\x82" + b"\x1b\x1dt" + bytes([32]) + b"\xe9"
+
+
+@run
+async def test_send_writes_one_rendered_receipt():
+    conn, transport = await open_loopback()
+    compiled = (await receipt()).compile()
+    await compiled.send(conn, total="1.00")
+    assert transport.written == b"Total: 1.00\n\x1bd2"
+    await conn.close()
@@ -0,0 +1,62 @@
+#  This Source Code Form is subject to the terms of the Mozilla Public
+#  License, v. 2.0. If a copy of the MPL was not distributed with this
+#  file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from StarPRNT.enums import ImageAlignment
+from StarPRNT.text import TextRenderer, _font
+
+from test_raster import decode
+
+
+def pillow_line(renderer: TextRenderer, line: str, left: int = 0) -> np.ndarray:
+    # every glyph drawn by Pillow where render_line puts it, thresholded the same way
+    face = _font(renderer.font, renderer.size)
+    img = Image.new("L", (renderer.width, renderer.line_height + renderer.line_spacing))
+    draw = ImageDraw.Draw(img)
+    pen = left
+    for char in line:
+        draw.text((round(pen), 0), char, font=face, fill=255)
+        pen += face.getlength(char)
+    return np.asarray(img) >= renderer.threshold
+
+
+def dots(band: np.ndarray, width: int) -> np.ndarray:
+    return np.unpackbits(band, axis=1)[:, :width].astype(bool)
+
+
+def test_render_line_matches_pillow():
+    renderer = TextRenderer(size=24)
+    assert np.array_equal(dots(renderer.render_line("Total 9.99"), 576), pillow_line(renderer, "Total 9.99"))
+
+
+def test_right_and_rtl_start_from_the_right_edge():
+    renderer = TextRenderer(size=24)
+    right = renderer.width - renderer.measure("abc")
+    assert np.array_equal(dots(renderer.render_line("abc", ImageAlignment.Right), 576),
+                          pillow_line(renderer, "abc", right))
+    assert np.array_equal(renderer.render_line("cba", rtl=True), renderer.render_line("abc", ImageAlignment.Right))
+
+
+def test_center():
+    renderer = TextRenderer(size=24)
+    ink = np.flatnonzero(dots(renderer.render_line("centre", ImageAlignment.Center), 576).any(axis=0))
+    assert abs((ink[0] + ink[-1]) / 2 - 288) <= 3
+
+
+def test_wrap_on_spaces():
+    renderer = TextRenderer(size=24, width=120)
+    lines = renderer.wrap("one two three four five\nsix")
+    assert " ".join(lines[:-1]) == "one two three four five" and lines[-1] == "six"
+    assert len(lines) > 2
+    assert all(renderer.measure(line) <= 120 or " " not in line for line in lines)
+
+
+def test_rasterize_decodes_to_the_rendered_lines():
+    renderer = TextRenderer(size=24)
+    bands = np.vstack([dots(band, 576) for band in renderer.bands("first\nsecond")])
+    printed = decode(renderer.rasterize("first\nsecond"), 576)
+    assert np.array_equal(printed, bands[:len(printed)])
+    assert not bands[len(printed):].any()